@@ -0,0 +1,375 @@
+"""
+Binary archive of Checkers games
+
+An archive stores many games compactly and gives access to any game without
+reading the others: the file is opened with mmap and an index of fixed-width
+offsets at the end of the file locates every game in O(1).
+
+Layout (all integers little-endian):
+    header: magic b"CKA1", format version (uint32)
+    games: for each game, a game header (n, flags, number of moves as
+        uint32), the snapshot of the starting position if the game did not
+        start from the usual start position, padded to an even length, and
+        one uint16 per step or jump
+    index: offset of every game (uint64), followed by the end of the last game
+    footer: offset of the index (uint64), number of games (uint64), magic
+
+The index and footer are only written when the archive is closed. An
+archive whose writer never closed it, for example because a self-play run
+was killed, is still readable: its games are found by walking the game
+headers from the start of the file, which takes time proportional to the
+number of games, and a game cut short at the end of the file is left out.
+
+A step or jump is encoded as (dark square * 4 + direction) * 2 + jump, where
+dark squares are numbered from 0 row by row starting at the top left and
+directions NW, NE, SW, SE are 0 to 3.
+
+Examples:
+    1) Writing games
+        with ArchiveWriter("games.cka") as writer:
+            writer.write_game(game)
+
+    2) Position after the 10th ply of game 123
+        archive = GameArchive("games.cka")
+        game = archive.replay(123, 10)
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from checkers import Checkers, GameState, Player, dark_index, dark_position
+
+_MAGIC = b"CKA1"
+_VERSION = 1
+_FILE_HEADER = struct.Struct("<4sI")
+# n, flags, number of moves
+_GAME_HEADER = struct.Struct("<BBxxI")
+# offset of the index, number of games, magic
+_FOOTER = struct.Struct("<QQ4s")
+_OFFSET = struct.Struct("<Q")
+
+# game header flags: the starting player, whether the game starts from a
+# stored snapshot and the result (0 unfinished, 1 top won, 2 bottom won,
+# 3 draw) in bits 2 and 3
+_BOTTOM_STARTS = 1
+_HAS_START = 2
+
+# row and column offsets of the directions NW, NE, SW, SE
+_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def encode_move(n, pos, dest):
+    """
+    Encodes a step or a single jump.
+
+    Parameters:
+        n: int: the number of rows of pieces a player starts with
+        pos: Tuple(int): tuple of row and column of piece
+        dest: Tuple(int): tuple of row and column of destination of move
+
+    Returns: int: encoded move
+    """
+    dr = dest[0] - pos[0]
+    dc = dest[1] - pos[1]
+    d = (2 if dr > 0 else 0) + (1 if dc > 0 else 0)
+    return (dark_index(pos, n) * 4 + d) * 2 + (abs(dr) == 2)
+
+
+def decode_move(n, code):
+    """
+    Decodes a step or a single jump encoded by encode_move.
+
+    Parameters:
+        n: int: the number of rows of pieces a player starts with
+        code: int: encoded move
+
+    Returns: Tuple: tuple of the position of the piece and its destination
+    """
+    jump = code & 1
+    square, d = divmod(code >> 1, 4)
+    i, j = dark_position(square, n)
+    dr, dc = _DIRECTIONS[d]
+    return (i, j), (i + dr * (1 + jump), j + dc * (1 + jump))
+
+
+class ArchiveWriter:
+    """
+    Class for writing games to a new archive
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Parameters:
+            path: str: file to write, replaced if it exists
+        """
+        self._file = open(path, "wb")
+        self._file.write(_FILE_HEADER.pack(_MAGIC, _VERSION))
+        self._offsets = array("Q")
+        self._end = _FILE_HEADER.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_game(self, game, start=None):
+        """
+        Appends a game played with move() to the archive.
+
+        Parameters:
+            game: Checkers or BitboardCheckers: the game
+            start: GameState: starting position, the start of a new game with
+                game.start_turn to move if None
+
+        Returns:
+            None
+        """
+        n = game._n
+        moves = array("H", (encode_move(n, pos, dest)
+                            for _, pos, dest in game.get_history()))
+
+        flags = 0
+        if game.start_turn == Player.BOTTOM:
+            flags |= _BOTTOM_STARTS
+        if game._game_over:
+            if game._winner is None:
+                flags |= 3 << 2
+            else:
+                flags |= (game._winner.value + 1) << 2
+        start_data = b""
+        if start is not None:
+            flags |= _HAS_START
+            start_data = start.to_bytes()
+            start_data += b"\0" * (len(start_data) % 2)
+
+        if sys.byteorder == "big":
+            moves.byteswap()
+        data = (_GAME_HEADER.pack(n, flags, len(moves)) + start_data
+                + moves.tobytes())
+        self._offsets.append(self._end)
+        self._file.write(data)
+        self._end += len(data)
+
+    def close(self):
+        """
+        Writes the index and closes the file. Until then, readers have to
+        scan the archive for its games (see the module docstring).
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if self._file.closed:
+            return
+        count = len(self._offsets)
+        self._offsets.append(self._end)
+        if sys.byteorder == "big":
+            self._offsets.byteswap()
+        self._file.write(self._offsets.tobytes())
+        self._file.write(_FOOTER.pack(self._end, count, _MAGIC))
+        self._file.close()
+
+
+class GameArchive:
+    """
+    Class for reading games from an archive
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Parameters:
+            path: str: archive written by ArchiveWriter, closed or not
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _FILE_HEADER.size:
+                raise Exception('Not a game archive')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = _FILE_HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or version != _VERSION:
+            self._mmap.close()
+            raise Exception('Not a game archive')
+
+        # the index of a closed archive, or the games found by a scan
+        size = len(self._mmap)
+        self._offsets = None
+        self._index = None
+        self._count = 0
+        if size >= _FILE_HEADER.size + _OFFSET.size + _FOOTER.size:
+            index, count, end_magic = _FOOTER.unpack_from(
+                self._mmap, size - _FOOTER.size)
+            if (end_magic == _MAGIC and index + _OFFSET.size * (count + 1)
+                    + _FOOTER.size == size):
+                self._index = index
+                self._count = count
+        if self._index is None:
+            self._offsets = self._scan()
+            self._count = len(self._offsets)
+
+    def _scan(self):
+        """
+        Finds the games of an archive that was not closed by walking their
+        headers. The walk stops at a game cut short by the end of the file,
+        and at an index left unfinished by a writer killed while closing.
+
+        Parameters:
+            None
+
+        Returns:
+            array: offset of every complete game
+        """
+        data = self._mmap
+        size = len(data)
+        offsets = array("Q")
+        offset = _FILE_HEADER.size
+        while offset + _GAME_HEADER.size <= size:
+            # the index lists the offsets of the games found so far, and the
+            # end of the last one
+            entries = min(len(offsets) + 1, (size - offset) // _OFFSET.size)
+            expected = (list(offsets) + [offset])[:entries]
+            if entries > 0 and all(
+                    _OFFSET.unpack_from(data, offset + _OFFSET.size * k)[0]
+                    == expected[k] for k in range(entries)):
+                break
+
+            n, flags, num_moves = _GAME_HEADER.unpack_from(data, offset)
+            end = offset + _GAME_HEADER.size + 2 * num_moves
+            if flags & _HAS_START:
+                start_size = GameState.packed_size(n)
+                end += start_size + start_size % 2
+            if end > size:
+                break
+            offsets.append(offset)
+            offset = end
+        return offsets
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        """
+        Closes the archive.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._mmap.close()
+
+    def _locate(self, i):
+        """
+        Finds where a game is stored.
+
+        Parameters:
+            i: int: index of the game
+
+        Returns: Tuple: n, flags, number of moves, offset of the start
+            snapshot and offset of the moves
+        """
+        if not 0 <= i < self._count:
+            raise Exception('Game index out of range')
+        if self._offsets is not None:
+            offset = self._offsets[i]
+        else:
+            offset, = _OFFSET.unpack_from(self._mmap, self._index + 8 * i)
+        n, flags, num_moves = _GAME_HEADER.unpack_from(self._mmap, offset)
+        start = offset + _GAME_HEADER.size
+        moves = start
+        if flags & _HAS_START:
+            size = GameState.packed_size(n)
+            moves += size + size % 2
+        return n, flags, num_moves, start, moves
+
+    def get_info(self, i):
+        """
+        Returns what the archive records about a game besides its moves.
+
+        Parameters:
+            i: int: index of the game
+
+        Returns: Tuple: the number of rows of pieces a player starts with,
+            the starting player, the number of steps and jumps, whether the
+            game is over and the winner (None for a draw or an unfinished
+            game)
+        """
+        n, flags, num_moves, _, _ = self._locate(i)
+        result = flags >> 2 & 3
+        winner = Player(result - 1) if result in (1, 2) else None
+        return (n, Player(flags & _BOTTOM_STARTS), num_moves, result != 0,
+                winner)
+
+    def get_moves(self, i):
+        """
+        Returns the encoded steps and jumps of a game. The codes are copied
+        out of the file, so they stay valid after the archive is closed.
+
+        Parameters:
+            i: int: index of the game
+
+        Returns: array: one uint16 per step or jump, see decode_move
+        """
+        _, _, num_moves, _, moves = self._locate(i)
+        codes = array("H")
+        codes.frombytes(self._mmap[moves:moves + 2 * num_moves])
+        if sys.byteorder == "big":
+            codes.byteswap()
+        return codes
+
+    def get_start(self, i):
+        """
+        Returns the starting position of a game.
+
+        Parameters:
+            i: int: index of the game
+
+        Returns:
+            GameState: snapshot of the starting position
+        """
+        n, flags, _, start, _ = self._locate(i)
+        if flags & _HAS_START:
+            size = GameState.packed_size(n)
+            return GameState(self._mmap[start:start + size])
+        game = Checkers(n)
+        game.set_turn(Player(flags & _BOTTOM_STARTS))
+        game.start_turn = game.get_turn()
+        return game.snapshot()
+
+    def replay(self, i, ply=None):
+        """
+        Reconstructs the position of a game after a number of steps and
+        jumps.
+
+        Parameters:
+            i: int: index of the game
+            ply: int: number of steps and jumps to play, all of them if None
+
+        Returns:
+            Checkers: the game in that position
+        """
+        n = self._locate(i)[0]
+        game = Checkers.from_snapshot(self.get_start(i))
+        moves = self.get_moves(i)
+        if ply is None:
+            ply = len(moves)
+        for code in moves[:ply]:
+            pos, dest = decode_move(n, code)
+            move = game._find_move(pos, dest)
+            if move is None:
+                raise Exception('Invalid move in archived game')
+            game._play_move(move)
+        return game
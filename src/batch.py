@@ -0,0 +1,404 @@
+"""
+Batched Checkers engine for self-play.
+
+BatchCheckers holds K games of the same size as NumPy arrays and steps all of
+them at once: legal moves of every game are computed with whole-array
+operations, and one move per game is applied in a single call. The rules are
+the ones of checkers.Checkers: jumps are forced, a piece that can keep jumping
+must do so in the same turn (one jump per step), kinging ends the turn, a
+player without moves loses, and 40 moves without a capture or the third
+occurrence of a position end the game in a draw.
+
+Squares are stored as 0 (empty), 1 (top piece), 2 (bottom piece), 3 (top king)
+and 4 (bottom king). Pieces only ever stand on dark squares, which are
+numbered from 0 row by row. A move is encoded as an action
+direction * (number of dark squares) + dark square of the piece, with
+directions NW, NE, SW, SE as 0 to 3; whether it is a step or a jump follows
+from the position, since jumps are forced.
+
+Examples:
+    1) Playing 1000 random games to the end
+        games = BatchCheckers(3, 1000)
+        while not games.game_over().all():
+            games.step(games.random_actions())
+"""
+import numpy as np
+from checkers import GameState, Player, dark_index
+
+EMPTY, TOP, BOTTOM, TOP_KING, BOTTOM_KING = range(5)
+
+# row and column offsets of the directions NW, NE, SW, SE
+_DR = np.array([-1, -1, 1, 1])
+_DC = np.array([-1, 1, -1, 1])
+
+# positions kept per game for repetition detection. Positions before a
+# capture can never occur again, and the 40 moves rule ends a game well
+# before this many moves are made without a capture.
+_REPEAT_WINDOW = 128
+
+
+class BatchCheckers:
+    """
+    Class for representing K games of Checkers of the same size that are
+    played in lockstep
+    """
+
+    def __init__(self, n, k, seed=None):
+        """
+        Constructor
+
+        Parameters:
+            n: int: the number of rows of pieces a player starts with
+            to begin the game
+            k: int: the number of games
+            seed: int: seed for choosing starting players and random moves
+        """
+        self._n = n
+        self._k = k
+        self._size = 2 * n + 2
+        self._rng = np.random.default_rng(seed)
+
+        # boards are stored surrounded by two rows and columns of -1 and
+        # flattened, so that the neighbours of every square in a direction
+        # are a plain slice away and never out of bounds
+        size = self._size
+        self._width = size + 4
+        self._margin = 2 * self._width + 2
+        rows, cols = np.nonzero((np.indices((size, size)).sum(axis=0) % 2)
+                                == 1)
+        self._dark_rows = rows
+        self._dark_cols = cols
+        self._dark = (rows + 2) * self._width + cols + 2 - self._margin
+        self._offsets = _DR * self._width + _DC
+
+        # random keys of every piece on every square and of the turn, summed
+        # to hash positions
+        keys = np.random.default_rng(size).integers(
+            np.iinfo(np.int64).min, np.iinfo(np.int64).max,
+            size=(6, size * size), dtype=np.int64)
+        keys[EMPTY] = 0
+        self._piece_keys = keys[:5]
+        self._turn_key = keys[5, 0]
+        self.new_game()
+
+    def new_game(self, turns=None):
+        """
+        Resets every game to start state.
+
+        Parameters:
+            turns: array of int: player (0 top, 1 bottom) starting each game,
+                chosen at random if None
+
+        Returns:
+            None
+        """
+        n, k, size = self._n, self._k, self._size
+        rows, cols = np.indices((size, size))
+        dark = (rows + cols) % 2 == 1
+        start = np.zeros((size, size), dtype=np.int8)
+        start[dark & (rows < n)] = TOP
+        start[dark & (rows >= n + 2)] = BOTTOM
+        self._padded = np.full((k, size + 4, size + 4), -1, dtype=np.int8)
+        self._flat = self._padded.reshape(k, -1)
+        self._board = self._padded[:, 2:-2, 2:-2]
+        self._board[:] = start
+
+        if turns is None:
+            turns = self._rng.integers(0, 2, size=k)
+        self._turn = np.array(turns, dtype=np.int8).reshape(k)
+        self.start_turn = self._turn.copy()
+        self._jumper = np.full(k, -1, dtype=np.int64)
+        self._last_capture = np.zeros((k, 2), dtype=np.int16)
+        self._game_over = np.zeros(k, dtype=bool)
+        self._winner = np.full(k, -1, dtype=np.int8)
+        self._legal = None
+
+        # keys of the positions since the last capture of each game
+        self._keys = np.zeros((k, _REPEAT_WINDOW), dtype=np.int64)
+        self._keys[:, 0] = self._position_keys(np.arange(k))
+        self._num_keys = np.ones(k, dtype=np.int64)
+
+    def _moves(self, turn):
+        """
+        Computes the steps and jumps available to every piece of the given
+        player of each game, regardless of forced jumps.
+
+        Parameters:
+            turn: array of int: player (0 top, 1 bottom) to move in each game
+
+        Returns: Tuple(array, array): boolean arrays of shape
+            (K, 4, dark squares) of the steps and of the jumps, per direction
+            and dark square of the piece
+        """
+        k = self._k
+        flat = self._flat
+        start, end = self._margin, flat.shape[1] - self._margin
+        top_turn = (turn == 0)[:, None]
+        occupied = flat > 0
+        # top pieces and kings are odd, bottom ones even
+        top = (flat & 1).astype(bool)
+        mine = occupied & (top == top_turn)
+        theirs = occupied & (top != top_turn)
+        kings = flat >= TOP_KING
+        empty = flat == EMPTY
+        # top pieces move down the board, bottom pieces move up
+        down = (mine & (kings | top_turn))[:, start:end]
+        up = (mine & (kings | ~top_turn))[:, start:end]
+
+        steps = np.empty((k, 4, end - start), dtype=bool)
+        jumps = np.empty((k, 4, end - start), dtype=bool)
+        for d in range(4):
+            o = self._offsets[d]
+            movers = down if _DR[d] > 0 else up
+            np.logical_and(movers, empty[:, start + o:end + o],
+                           out=steps[:, d])
+            np.logical_and(movers, theirs[:, start + o:end + o],
+                           out=jumps[:, d])
+            jumps[:, d] &= empty[:, start + 2 * o:end + 2 * o]
+        steps = steps[:, :, self._dark]
+        jumps = jumps[:, :, self._dark]
+        return steps, jumps
+
+    def _compute_legal(self):
+        """
+        Computes the legal actions of every game.
+
+        Parameters:
+            None
+
+        Returns: Tuple(array, array): boolean array of shape (K, actions) of
+            legal actions, and boolean array of shape (K,) of whether the
+            legal actions are jumps
+        """
+        k = self._k
+        steps, jumps = self._moves(self._turn)
+        steps = steps.reshape(k, -1)
+        jumps = jumps.reshape(k, -1)
+
+        # a piece in the middle of a multiple jump is the only one to move
+        jumping = self._jumper >= 0
+        if jumping.any():
+            only = np.zeros_like(jumps)
+            games = np.nonzero(jumping)[0]
+            directions = np.arange(4) * len(self._dark)
+            only[games[:, None],
+                 self._jumper[games, None] + directions] = True
+            jumps[jumping] &= only[jumping]
+
+        is_jump = jumps.any(axis=1)
+        legal = np.where(is_jump[:, None], jumps, steps)
+        legal[self._game_over] = False
+        return legal, is_jump
+
+    def legal_moves(self):
+        """
+        Returns the legal actions of every game. If a jump is available, only
+        jumps are legal. Games that are over have no legal actions.
+
+        Parameters:
+            None
+
+        Returns: array: boolean array of shape (K, 4 * dark squares)
+        """
+        if self._legal is None:
+            self._legal = self._compute_legal()
+        return self._legal[0]
+
+    def random_actions(self):
+        """
+        Picks a legal action uniformly at random in every game.
+
+        Parameters:
+            None
+
+        Returns: array: action of each game, -1 for games without legal moves
+        """
+        legal = self.legal_moves()
+        scores = self._rng.random(legal.shape, dtype=np.float32)
+        actions = np.where(legal, scores, -1).argmax(axis=1)
+        actions[~legal.any(axis=1)] = -1
+        return actions
+
+    def encode_move(self, pos, dest):
+        """
+        Returns the action of moving a piece from a position to a destination.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of piece
+            dest: Tuple(int): tuple of row and column of destination of move
+
+        Returns: int: action
+        """
+        dr = 1 if dest[0] > pos[0] else -1
+        dc = 1 if dest[1] > pos[1] else -1
+        d = (dr + 1) + (dc + 1) // 2
+        return d * len(self._dark) + dark_index(pos, self._n)
+
+    def step(self, actions):
+        """
+        Makes one move in every game. Games that are over, or whose action is
+        -1, are left unchanged.
+
+        Parameters:
+            actions: array of int: action of each game
+
+        Returns:
+            None
+        """
+        size = self._size
+        actions = np.asarray(actions, dtype=np.int64).reshape(self._k)
+        legal = self.legal_moves()
+        is_jump = self._legal[1]
+
+        games = np.nonzero((actions >= 0) & ~self._game_over)[0]
+        if len(games) == 0:
+            return
+        action = actions[games]
+        if not legal[games, action].all():
+            raise Exception('Invalid move.')
+
+        d, square = np.divmod(action, len(self._dark))
+        row, col = self._dark_rows[square], self._dark_cols[square]
+        dr, dc = _DR[d], _DC[d]
+        jump = is_jump[games]
+        dest_row = row + dr * (1 + jump)
+        dest_col = col + dc * (1 + jump)
+
+        # move the piece, kinging it if it reaches the end of the board
+        piece = self._board[games, row, col]
+        top = piece % 2 == 1
+        kinged = (piece < TOP_KING) & np.where(top, dest_row == size - 1,
+                                               dest_row == 0)
+        self._board[games, row, col] = EMPTY
+        self._board[games, dest_row, dest_col] = piece + 2 * kinged
+
+        # remove jumped over pieces
+        self._board[games[jump], (row + dr)[jump], (col + dc)[jump]] = EMPTY
+
+        # kinging ends the turn, otherwise a piece that jumped keeps jumping
+        continuing = jump & ~kinged
+        more = self._can_jump(games[continuing], dest_row[continuing],
+                              dest_col[continuing])
+        continuing[continuing] = more
+        self._jumper[games] = np.where(
+            continuing, dark_index((dest_row, dest_col), self._n), -1)
+
+        # change turns and update moves since last capture
+        done = games[~continuing]
+        mover = self._turn[done]
+        counts = self._last_capture[done, mover]
+        self._last_capture[done, mover] = np.where(jump[~continuing], 0,
+                                                   counts + 1)
+        self._turn[done] = 1 - mover
+
+        # record the positions of the games that changed turns, forgetting
+        # the ones before a capture
+        self._num_keys[done[jump[~continuing]]] = 0
+        keys = self._position_keys(done)
+        seen = ((self._keys[done] == keys[:, None])
+                & (np.arange(_REPEAT_WINDOW) < self._num_keys[done, None]))
+        repeated = seen.sum(axis=1) >= 2
+        self._keys[done, self._num_keys[done] % _REPEAT_WINDOW] = keys
+        self._num_keys[done] += 1
+
+        # evaluate game state of the games that changed turns
+        self._legal = self._compute_legal()
+        stuck = ~self._legal[0][done].any(axis=1)
+        self._game_over[done[stuck]] = True
+        self._winner[done[stuck]] = mover[stuck]
+        stalled = self._last_capture[done, 1 - mover] >= 40
+        self._game_over[done[~stuck & (stalled | repeated)]] = True
+        self._legal[0][self._game_over] = False
+
+    def _position_keys(self, games):
+        """
+        Hashes the positions of some games.
+
+        Parameters:
+            games: array of int: indices of the games
+
+        Returns: array: int64 key of each position
+        """
+        cells = self._board[games].reshape(len(games), -1)
+        keys = self._piece_keys[cells, np.arange(cells.shape[1])].sum(axis=1)
+        return keys + self._turn_key * self._turn[games]
+
+    def _can_jump(self, games, rows, cols):
+        """
+        Checks whether single pieces can jump.
+
+        Parameters:
+            games: array of int: index of the game of each piece
+            rows: array of int: row of each piece
+            cols: array of int: column of each piece
+
+        Returns: array: boolean array of whether each piece can jump
+        """
+        piece = self._board[games, rows, cols][:, None]
+        player = (piece - 1) % 2
+        rows = rows[:, None] + 2
+        cols = cols[:, None] + 2
+        over = self._padded[games[:, None], rows + _DR, cols + _DC]
+        land = self._padded[games[:, None], rows + 2 * _DR, cols + 2 * _DC]
+        forward = np.where(player == 0, _DR > 0, _DR < 0)
+        return ((forward | (piece >= TOP_KING)) & (over > 0)
+                & ((over - 1) % 2 != player) & (land == EMPTY)).any(axis=1)
+
+    def game_over(self):
+        """
+        Returns whether each game is over.
+
+        Parameters:
+            None
+
+        Returns: array: boolean array of shape (K,)
+        """
+        return self._game_over
+
+    def winners(self):
+        """
+        Returns the winner of each game.
+
+        Parameters:
+            None
+
+        Returns: array: 0 if top won, 1 if bottom won, -1 for a draw or a game
+            in progress
+        """
+        return self._winner
+
+    def get_turns(self):
+        """
+        Returns the player to move in each game.
+
+        Parameters:
+            None
+
+        Returns: array: 0 if it is top's turn, 1 if it is bottom's
+        """
+        return self._turn
+
+    def snapshot(self, i):
+        """
+        Returns a snapshot of one game that checkers.Checkers.from_snapshot()
+        can load.
+
+        Parameters:
+            i: int: index of the game
+
+        Returns:
+            GameState: snapshot of the game
+        """
+        winner = Player(int(self._winner[i])) if self._winner[i] >= 0 else None
+        jumping = None
+        square = int(self._jumper[i])
+        if square >= 0:
+            jumping = (int(self._dark_rows[square]),
+                       int(self._dark_cols[square]))
+        cells = self._board[i][self._dark_rows, self._dark_cols].tolist()
+        return GameState.pack(self._n, (Player(int(self._turn[i])),
+                                        Player(int(self.start_turn[i])),
+                                        False, False, bool(self._game_over[i]),
+                                        winner, int(self._last_capture[i, 0]),
+                                        int(self._last_capture[i, 1]),
+                                        jumping), cells)
@@ -0,0 +1,667 @@
+"""
+Bitboard implementation of the Checkers engine.
+
+Each side's men and kings are kept as Python integers used as bitmasks, so any
+board size n is supported. Square (row, col) is stored at bit
+row * (2n + 3) + col: every row carries one extra "ghost" column that never
+holds a piece, which stops diagonal shifts from wrapping around the edges of
+the board. Moves and captures for every piece of a side are then generated
+with a handful of shifts and masks per direction.
+
+The public interface matches checkers.Checkers, except that the third element
+of a jumping move is the (row, col) of the jumped piece instead of a Piece
+object (it is still None for non-jumping moves).
+
+Examples:
+    1) Creating a checkers board
+        g1 = BitboardCheckers(3)
+
+    2) Obtaining a list of all possible moves a turn player can make
+        g1.player_moves()
+"""
+import random
+from checkers import (_PIECE_CHARS, GameState, Player, dark_index,
+                      dark_position)
+
+# players by value, to switch turns without creating enum members
+_PLAYERS = (Player.TOP, Player.BOTTOM)
+
+
+class BitboardCheckers:
+    """
+    Class for representing a game of Checkers with the same interface as
+    checkers.Checkers, storing the board as integer bitmasks
+    """
+
+    def __init__(self, n):
+        """
+        Constructor
+
+        Parameters:
+            n: int: the number of rows of pieces a player starts with
+            to begin the game
+        """
+        self._n = n
+        self._size = 2 * n + 2
+        self._stride = self._size + 1
+
+        size = self._size
+        stride = self._stride
+        self._coords = {}
+        self._valid = 0
+        for i in range(size):
+            for j in range(size):
+                if (i + j) % 2 == 1:
+                    self._valid |= 1 << (i * stride + j)
+                    self._coords[i * stride + j] = (i, j)
+
+        # last row (TOP kings) and first row (BOTTOM kings)
+        row = (1 << size) - 1
+        self._king_row = [row << ((size - 1) * stride), row]
+
+        # men move away from their own side, kings move both ways
+        self._men_dirs = [[stride - 1, stride + 1],
+                          [-(stride - 1), -(stride + 1)]]
+        self._dirs = [stride - 1, stride + 1, -(stride - 1), -(stride + 1)]
+        self._blank = (b'|_' * size + b'|\n') * size
+
+        self.new_game()
+
+    def new_game(self):
+        """
+        Resets the game to start state.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        t = Player(random.randint(0, 1))
+        self._turn = t
+        self._game_over = False
+        self._draw_p1 = False
+        self._draw_p2 = False
+        self._last_capture_p1 = 0
+        self._last_capture_p2 = 0
+        self._multjump = []
+        self._winner = None
+        self.start_turn = t
+        self._history = []
+        self._positions = []
+        self._position_counts = {}
+        self._moves_key = None
+        self._moves = None
+        self._pair_moves = None
+        self._moves_by_pair = None
+
+        n = self._n
+        top = 0
+        bottom = 0
+        for i in range(self._size):
+            row_bits = self._valid & (((1 << self._size) - 1)
+                                      << (i * self._stride))
+            if i < n:
+                top |= row_bits
+            elif i >= n + 2:
+                bottom |= row_bits
+        self._men = [top, bottom]
+        self._kings = [0, 0]
+
+    def snapshot(self):
+        """
+        Returns an immutable snapshot of everything the game tracks, in the
+        same format as checkers.Checkers.snapshot().
+
+        Parameters:
+            None
+
+        Returns:
+            GameState: snapshot of the game
+        """
+        n = self._n
+        cells = [0] * (2 * (n + 1) * (n + 1))
+        for cell, bits in ((1, self._men[0]), (2, self._men[1]),
+                           (3, self._kings[0]), (4, self._kings[1])):
+            while bits:
+                low = bits & -bits
+                cells[dark_index(self._coords[low.bit_length() - 1], n)] = cell
+                bits ^= low
+        jumping = self._multjump[0][0] if len(self._multjump) > 0 else None
+        return GameState.pack(n, (self._turn, self.start_turn, self._draw_p1,
+                                  self._draw_p2, self._game_over,
+                                  self._winner, self._last_capture_p1,
+                                  self._last_capture_p2, jumping), cells)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """
+        Creates a game in the state recorded by a snapshot taken from either
+        engine.
+
+        Parameters:
+            state: GameState: snapshot returned by snapshot()
+
+        Returns:
+            BitboardCheckers: new game
+        """
+        n = state.get_n()
+        game = cls(n)
+        (game._turn, game.start_turn, game._draw_p1, game._draw_p2,
+         game._game_over, game._winner, game._last_capture_p1,
+         game._last_capture_p2, jumping) = state.header()
+
+        game._men = [0, 0]
+        game._kings = [0, 0]
+        for k, cell in enumerate(state.cells()):
+            if cell:
+                i, j = dark_position(k, n)
+                bit = 1 << (i * game._stride + j)
+                if cell > 2:
+                    game._kings[cell - 3] |= bit
+                else:
+                    game._men[cell - 1] |= bit
+
+        if jumping is not None:
+            bit = game._bit(jumping)
+            v = game._turn.value
+            game._multjump, _ = game._moves_from(v, game._men[v] & bit,
+                                                 game._kings[v] & bit, True)
+        return game
+
+    def _bit(self, pos):
+        """
+        Returns the bitmask of a square on the board, or 0 if the position is
+        off the board.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column
+
+        Returns:
+            int: bitmask with a single bit set, or 0
+        """
+        i, j = pos
+        if i is None or j is None:
+            return 0
+        if 0 <= i < self._size and 0 <= j < self._size:
+            return 1 << (i * self._stride + j)
+        return 0
+
+    def __str__(self):
+        """
+        Returns string representation of board state, with b indicating black
+        piece and r indicating red piece, with king pieces capitalized.
+        (Purpose of this method is mainly for debugging.)
+
+        Parameters:
+            None
+
+        Returns:
+            String
+        """
+        # rows of the rendered board are twice as long as rows of bits, so
+        # the character of the square of bit k is at offset 2 * k + 1
+        image = bytearray(self._blank)
+        chars = _PIECE_CHARS
+        if self.start_turn == Player.BOTTOM:
+            chars = chars[::-1]
+        for v in range(2):
+            for bits, char in ((self._men[v], chars[v][False]),
+                               (self._kings[v], chars[v][True])):
+                while bits:
+                    low = bits & -bits
+                    image[2 * low.bit_length() - 1] = char
+                    bits ^= low
+        return image.decode()
+
+    def resign(self):
+        """
+        Withdraws the current player from the game and ends the game.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._game_over = True
+        self._winner = Player((self._turn.value + 1) % 2)
+
+    def draw(self):
+        """
+        Player requests for a draw. Draw can be made when both players call for
+        a draw during their respective turns.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if self._turn == Player.TOP:
+            self._draw_p1 = True
+        else:
+            self._draw_p2 = True
+
+        if self._draw_p1 and self._draw_p2:
+            self._game_over = True
+
+    def get_game_state(self):
+        """
+        Returns the current game state: whether game is over, and the winner if
+        the game is over.
+
+        Parameters:
+            None
+
+        Returns:
+            Tuple(Boolean, Player): first element indicates game over and second
+            element stores player object if winner exists
+        """
+        return (self._game_over, self._winner)
+
+    def winner(self):
+        """
+        Prints the current game state: win, draw, or still in progress.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if self._winner is not None:
+            print("Player", (self._winner.value + 1) % 2 + 1, "Loses.")
+            print("Player", self._winner.value + 1, "Wins.")
+        elif self._game_over:
+            print("Draw has been made.")
+        else:
+            print('Game still in progress. No winner has been decided yet.')
+
+    def _check_winner(self):
+        """
+        Internally evaluates current game state and assigns winner if one
+        exists.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if len(self.player_moves()) == 0:
+            self._game_over = True
+            self._winner = Player((self._turn.value + 1) % 2)
+        else:
+            # automatic draw if 40 moves since last capture
+            if self._turn == Player.TOP:
+                if self._last_capture_p1 >= 40:
+                    self._game_over = True
+            else:
+                if self._last_capture_p2 >= 40:
+                    self._game_over = True
+
+            # automatic draw if the same position occurs for the third time
+            if self._position_counts.get(self._position(), 0) >= 2:
+                self._game_over = True
+
+    def _position(self):
+        """
+        Returns a value identifying the current position: the bitmasks, the
+        turn and the square of the piece making a multi-jump, if any.
+
+        Parameters:
+            None
+
+        Returns:
+            Tuple: hashable position
+        """
+        jumping = 0
+        if len(self._multjump) > 0:
+            jumping = self._bit(self._multjump[0][0])
+        return (self._men[0], self._men[1], self._kings[0], self._kings[1],
+                self._turn, jumping)
+
+    def repetition_count(self):
+        """
+        Returns how many times the current position has occurred in the game
+        so far, counting the current occurrence.
+
+        Parameters:
+            None
+
+        Returns:
+            int: number of occurrences, at least 1
+        """
+        return self._position_counts.get(self._position(), 0) + 1
+
+    def get_turn(self):
+        """
+        Gets the player of the current turn.
+
+        Parameters:
+            None
+
+        Returns:
+            Player object of whose turn it is
+        """
+        return self._turn
+
+    def set_turn(self, player):
+        '''
+        Assign the turn to a specified player.
+
+        Parameters:
+            player: Player: enum of player who we want to change the turn to
+
+        Returns:
+            None
+        '''
+        if not isinstance(player, Player):
+            raise Exception('Must provide Player object')
+        self._turn = player
+
+    def _moves_from(self, v, men, kings, jumps_only):
+        """
+        Generates the moves of a set of pieces of one player with shifts and
+        masks, one direction at a time.
+
+        Parameters:
+            v: int: value of the player moving the pieces
+            men: int: bitmask of the men to generate moves for
+            kings: int: bitmask of the kings to generate moves for
+            jumps_only: bool: whether non-jumping moves should be skipped
+
+        Returns: Tuple(List[moves], List[moves]): jumping and non-jumping moves
+        """
+        coords = self._coords
+        opp = self._men[1 - v] | self._kings[1 - v]
+        empty = self._valid & ~(opp | self._men[v] | self._kings[v])
+        men_dirs = self._men_dirs[v]
+
+        jumps = []
+        non_jumps = []
+        for d in self._dirs:
+            movers = kings | men if d in men_dirs else kings
+            if not movers:
+                continue
+
+            if d > 0:
+                lands = (((movers << d) & opp) << d) & empty
+            else:
+                lands = (((movers >> -d) & opp) >> -d) & empty
+            while lands:
+                low = lands & -lands
+                dest = low.bit_length() - 1
+                lands ^= low
+                jumps.append((coords[dest - 2 * d], coords[dest],
+                              coords[dest - d]))
+
+            if jumps_only or jumps:
+                continue
+
+            if d > 0:
+                steps = (movers << d) & empty
+            else:
+                steps = (movers >> -d) & empty
+            while steps:
+                low = steps & -steps
+                dest = low.bit_length() - 1
+                steps ^= low
+                non_jumps.append((coords[dest - d], coords[dest], None))
+
+        return jumps, non_jumps
+
+    def player_moves(self):
+        """
+        Returns list of moves available to the player in the corresponding turn.
+        If a jump is available, only jumps are shown.
+
+        Parameters:
+            None
+
+        Returns: List[moves]: list with each element containing the position of
+            the piece, the destination of the piece once the move is made and
+            the position of the jumped piece (None if not a jump)
+        """
+        if len(self._multjump) > 0:
+            return self._multjump
+
+        # the moves of a position are cached, since the bots, move() and
+        # _check_winner() all ask for them
+        v = self._turn.value
+        men = self._men
+        kings = self._kings
+        key = (men[0], men[1], kings[0], kings[1], v)
+        if key != self._moves_key:
+            jumps, non_jumps = self._moves_from(v, men[v], kings[v], False)
+            self._moves = jumps if len(jumps) > 0 else non_jumps
+            self._moves_key = key
+        return self._moves
+
+    def piece_moves(self, pos):
+        """
+        Returns list of valid moves available to a piece of the turn player
+        on the board in the context of the game.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of piece
+
+        Returns: List[moves]: moves in the same format as player_moves
+        """
+        moves = []
+        for move in self.player_moves():
+            if move[0] == pos:
+                moves.append(move)
+        return moves
+
+    def is_valid_move(self, pos, dest):
+        """
+        Returns whether move is valid for piece located at the specified
+        position. Player must have the current turn otherwise the move will
+        be considered invalid.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of piece
+            dest: Tuple(int): tuple of row and column of destination of move
+
+        Returns:
+            Boolean: whether or not the move is valid
+        """
+        return self._find_move(pos, dest) is not None
+
+    def _find_move(self, pos, dest):
+        """
+        Looks up the move of the turn player from a position to a destination.
+        The lookup table is built once per list of moves from player_moves().
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of piece
+            dest: Tuple(int): tuple of row and column of destination of move
+
+        Returns: move: the matching move, or None if the move is not valid
+        """
+        moves = self.player_moves()
+        if moves is not self._pair_moves:
+            self._moves_by_pair = {(move[0], move[1]): move for move in moves}
+            self._pair_moves = moves
+        return self._moves_by_pair.get((tuple(pos), tuple(dest)))
+
+    def move(self, pos, dest):
+        """
+        Select a valid move on the board for the player in the current turn and
+        update the location of the moved piece.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of piece
+            dest: Tuple(int): tuple of row and column of destination of move
+
+        Returns:
+            None
+        """
+        if self._game_over:
+            return
+
+        # only moves of the turn player are in the lookup table
+        found_move = self._find_move(pos, dest)
+        if found_move is None:
+            return
+
+        self._history.append((self._turn, found_move[0], found_move[1]))
+        self._make_move(found_move)
+
+    def get_history(self):
+        """
+        Returns the moves made with move() since the start of the game, one
+        entry per single step or jump.
+
+        Parameters:
+            None
+
+        Returns: List[Tuple]: tuples of the player that moved, the position
+            of the piece and its destination
+        """
+        return self._history
+
+    def apply_move(self, move):
+        """
+        Makes a move taken from player_moves() without validating it, and
+        returns a record of the previous state so that undo_move() can take it
+        back.
+
+        Parameters:
+            move: Tuple: move as returned by player_moves()
+
+        Returns:
+            Tuple: undo record to pass to undo_move()
+        """
+        record = (self._men[0], self._men[1], self._kings[0], self._kings[1],
+                  self._multjump, self._turn, self._draw_p1, self._draw_p2,
+                  self._last_capture_p1, self._last_capture_p2,
+                  self._game_over, self._winner)
+        self._make_move(move)
+        return record
+
+    def undo_move(self, record):
+        """
+        Restores the game to the exact state it was in before the move that
+        produced the undo record.
+
+        Parameters:
+            record: Tuple: undo record returned by apply_move()
+
+        Returns:
+            None
+        """
+        (top_men, bottom_men, top_kings, bottom_kings, self._multjump,
+         self._turn, self._draw_p1, self._draw_p2, self._last_capture_p1,
+         self._last_capture_p2, self._game_over, self._winner) = record
+        self._men = [top_men, bottom_men]
+        self._kings = [top_kings, bottom_kings]
+
+        position = self._positions.pop()
+        if self._position_counts[position] == 1:
+            del self._position_counts[position]
+        else:
+            self._position_counts[position] -= 1
+
+    def _make_move(self, move):
+        """
+        Updates the bitmasks and the game state for a move of the turn player,
+        only to be used by internal logic once the move is known to be valid.
+
+        Parameters:
+            move: Tuple: move as returned by player_moves()
+
+        Returns:
+            None
+        """
+        pos, dest, jumped = move
+        stride = self._stride
+        src = 1 << (pos[0] * stride + pos[1])
+        dst = 1 << (dest[0] * stride + dest[1])
+        v = self._turn.value
+
+        # remember the position the move is made from
+        position = self._position()
+        self._positions.append(position)
+        self._position_counts[position] = \
+            self._position_counts.get(position, 0) + 1
+
+        # move the piece, kinging it if it reaches the end of the board
+        kinged = False
+        if self._kings[v] & src:
+            self._kings[v] ^= src | dst
+        elif dst & self._king_row[v]:
+            self._men[v] ^= src
+            self._kings[v] |= dst
+            kinged = True
+        else:
+            self._men[v] ^= src | dst
+
+        if jumped is not None:
+            # remove jumped over piece
+            mid = 1 << (jumped[0] * stride + jumped[1])
+            self._men[1 - v] &= ~mid
+            self._kings[1 - v] &= ~mid
+
+            # change turns or continuing jumping
+            consecutive_jumps = []
+            if not kinged:
+                if self._kings[v] & dst:
+                    consecutive_jumps, _ = self._moves_from(v, 0, dst, True)
+                else:
+                    consecutive_jumps, _ = self._moves_from(v, dst, 0, True)
+
+            # kinging ends turn (must also reset multjumps)
+            if len(consecutive_jumps) > 0:
+                self._multjump = consecutive_jumps
+            else:
+                self._multjump = []
+
+                if v == 0:
+                    self._last_capture_p1 = 0
+                    self._draw_p2 = False
+                else:
+                    self._last_capture_p2 = 0
+                    self._draw_p1 = False
+                self._turn = _PLAYERS[1 - v]
+                self._check_winner()
+        else:
+            # change turns and evaluate game state!
+            if v == 0:
+                self._last_capture_p1 += 1
+                self._draw_p2 = False
+            else:
+                self._last_capture_p2 += 1
+                self._draw_p1 = False
+            self._turn = _PLAYERS[1 - v]
+            self._check_winner()
+
+    def to_piece_grid(self):
+        """
+        Returns a copy of the state of the board as list of lists, with
+        information on the locations and states of the players pieces.
+
+        Parameters:
+            None
+
+        Returns:
+            List[List]: list of lists
+        """
+        # the player who started the game is always shown as black
+        if self.start_turn == Player.BOTTOM:
+            letters = ['r', 'b']
+        else:
+            letters = ['b', 'r']
+
+        grid_list = [[' '] * self._size for _ in range(self._size)]
+        for v in range(2):
+            for bits, letter in ((self._men[v], letters[v]),
+                                 (self._kings[v], letters[v].upper())):
+                while bits:
+                    low = bits & -bits
+                    i, j = self._coords[low.bit_length() - 1]
+                    grid_list[i][j] = letter
+                    bits ^= low
+        return grid_list
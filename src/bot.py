@@ -1,11 +1,19 @@
 """
 Bots for Checkers
 """
+import multiprocessing
 import random
+import time
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
 from checkers import Checkers, Player
+from bitboard import BitboardCheckers
+from pdn import PDNWriter
+from archive import ArchiveWriter
+from transposition import (TranspositionTable, SharedTranspositionTable,
+                           EXACT, LOWER, UPPER, encode_path)
 from typing import Union
 import click
-import copy
 import math
 
 #
@@ -13,6 +21,87 @@ import math
 #
 
 
+# stages of SmartBot's move ordering, in order of precedence: the best move
+# found by an earlier search, captures by number of pieces taken, killer
+# moves of the same ply, and the history heuristic
+ORDERING = ("tt", "captures", "killers", "history")
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out
+    """
+
+
+class SearchStats:
+    """
+    Counts of what searches did, to tell how well their moves are ordered:
+    with good ordering most cutoffs happen on the first move searched
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.reset()
+
+    def reset(self):
+        """
+        Sets every count back to zero.
+
+        Returns: None
+        """
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoff_moves = 0
+        self.researches = 0
+        self.fail_highs = 0
+        self.fail_lows = 0
+        self.reductions = 0
+        self.reduction_researches = 0
+        self.futility_prunes = 0
+        self.razor_prunes = 0
+
+    def record_cutoff(self, index):
+        """
+        Records a cutoff.
+
+        Parameters:
+          index: int: index of the move that caused it among the moves of
+                      the position, in the order they were searched
+
+        Returns: None
+        """
+        self.cutoffs += 1
+        self.cutoff_moves += index + 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+    def first_move_rate(self):
+        """
+        Returns the share of cutoffs caused by the first move searched.
+
+        Returns: float: share between 0 and 1, 0 if there was no cutoff
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0
+
+    def __str__(self):
+        moves = self.cutoff_moves / self.cutoffs if self.cutoffs else 0
+        return (f"{self.nodes} nodes, {self.qnodes} quiescence nodes, "
+                f"{self.cutoffs} cutoffs, "
+                f"{100 * self.first_move_rate():.1f}% on the first move, "
+                f"{moves:.2f} moves searched per cutoff, "
+                f"{self.researches} re-searches, "
+                f"{self.fail_highs} aspiration fail highs, "
+                f"{self.fail_lows} aspiration fail lows, "
+                f"{self.reductions} reductions "
+                f"({self.reduction_researches} re-searched), "
+                f"{self.futility_prunes} futility prunes, "
+                f"{self.razor_prunes} razor prunes")
+
+
 class RandomBot:
     """
     Simple Bot that just picks a move at random
@@ -73,8 +162,72 @@ class SmartBot:
 
     If the opponent requests a draw, rejects the request if bot has more pieces
     on the board.
+
+    Search results are kept in a transposition table, so positions reached
+    through different orders of moves, or searched on an earlier turn, are
+    not searched again, and the best move found for a position is tried
+    first when it is searched again.
+
+    Given a time budget per move, the bot searches to depth 1, 2, 3 and so
+    on until the budget runs out, and plays the best move of the deepest
+    search it completed.
+
+    Moves are searched best first, which lets alpha-beta prune more: the
+    best move of an earlier search of the position, then captures taking
+    the most pieces, then killer moves (quiet moves that caused a cutoff at
+    the same ply), then moves by their history score (how often and how
+    deep they caused cutoffs). Each stage can be turned off.
+
+    With several workers, the moves of the root are searched in parallel by
+    worker processes: the first move is searched by the bot itself to get a
+    score to beat, and the remaining ones are handed out to the workers,
+    which share the best score found so far. With a shared transposition
+    table, the workers instead all search the whole tree alongside the bot
+    (lazy SMP), half of them one move deeper, and cooperate through the
+    table, which lives in shared memory: what one of them finds saves the
+    others from searching it. Shallow searches, and roots with few moves,
+    are searched by the bot alone.
+
+    Where the search stops with a capture to be made, the evaluation would
+    miss pieces about to be lost, so a quiescence search carries on with
+    captures alone until the position is quiet (no capture to be made).
+    Since captures are forced, the player to move cannot stop the capture
+    sequence, and quiescence only looks at the few moves that remain.
+
+    Once the first move of a position has been searched, the others are
+    only searched to find out whether they are better (principal variation
+    search), with a window of zero width which prunes much more, and are
+    searched again in full when they are. Each search of iterative
+    deepening likewise starts with a narrow window around the score of the
+    previous one (aspiration window), widened if the score falls outside.
+
+    The search can also be selective: quiet moves ordered late are first
+    searched one move less deep (late move reductions), and positions near
+    the leaves whose evaluation is far from the window are pruned (futility
+    pruning and razoring).
     """
-    def __init__(self, game, player, opponent):
+    # nodes searched between two looks at the clock
+    CLOCK_NODES = 32
+    # deepest search of a timed move
+    MAX_DEPTH = 64
+    # half width of the first aspiration window
+    ASPIRATION = 50
+    # quiet moves searched in full before the others are reduced, and the
+    # least depth reduced
+    LMR_MOVES = 3
+    LMR_DEPTH = 3
+    # evaluation margins of futility pruning (a man) and razoring (a king)
+    FUTILITY_MARGIN = 3000
+    RAZOR_MARGIN = 5000
+    # least depth and number of moves of the root searched with the worker
+    # processes, below which handing out positions costs more than it saves
+    PARALLEL_DEPTH = 6
+    PARALLEL_MOVES = 4
+
+    def __init__(self, game, player, opponent, tt_mb=16, think_ms=None,
+                 ordering=ORDERING, depth=5, quiescence=True, workers=1,
+                 shared_tt=False, pvs=True, aspiration=ASPIRATION, lmr=True,
+                 futility=True, razoring=True):
         """
         Constructor
 
@@ -82,10 +235,62 @@ class SmartBot:
           game: game of Checkers the bot will play
           player: bot's player identity
           opponent: opponent's player identity
+          tt_mb: float: memory budget of the transposition table in
+                        megabytes, 0 to search without one
+          think_ms: float: time budget per move in milliseconds, None to
+                        always search to the given depth
+          ordering: Tuple(str): move ordering stages to use, out of ORDERING
+          depth: int: depth searched without a time budget
+          quiescence: bool: whether to search captures beyond the depth
+          workers: int: number of processes searching the moves of the root,
+                        1 to search in this process only
+          shared_tt: bool: whether the workers share the transposition table
+                        and search the whole tree instead of splitting the
+                        moves of the root
+          pvs: bool: whether to use principal variation search
+          aspiration: float: half width of the first aspiration window of
+                        iterative deepening, 0 to search with a full window
+          lmr: bool: whether to use late move reductions
+          futility: bool: whether to use futility pruning
+          razoring: bool: whether to use razoring
         """
         self._game = game
         self._player = player
         self._opponent = opponent
+        self._tt_mb = tt_mb
+        self._tt = None
+        if tt_mb > 0:
+            if shared_tt and workers > 1:
+                self._tt = SharedTranspositionTable(tt_mb)
+            else:
+                self._tt = TranspositionTable(tt_mb)
+        self._lazy_smp = isinstance(self._tt, SharedTranspositionTable)
+        self._think_ms = think_ms
+        self._depth = depth
+        self._quiescence = quiescence
+        self._pvs = pvs
+        self._aspiration = aspiration
+        self._lmr = lmr
+        self._futility = futility
+        self._razoring = razoring
+        self._deadline = None
+        self._ordering = ordering
+        self._order_tt = "tt" in ordering
+        self._order_captures = "captures" in ordering
+        self._order_killers = "killers" in ordering
+        self._order_history = "history" in ordering
+        self._killers = []
+        self._history = {}
+        self._ply = 0
+        self._root_move = None
+        self.stats = SearchStats()
+        self._workers = workers
+        self._pool = None
+        self._shared_alpha = None
+        # flag telling a worker process's bot to stop searching
+        self._stop = None
+        self._workers_stop = None
+        self._generation = 0
 
     def suggest_move(self):
         """
@@ -99,13 +304,177 @@ class SmartBot:
                 return ['N', 'N']
             else:
                 return ['Y', 'Y']
-        d, moves = self.abminimax(self._game, 5, -9999, 9999, True)
+        self.new_search()
+        if self._think_ms is None:
+            d, moves = self.search(self._game, self._depth)
+        else:
+            d, moves, _ = self.iterative_deepening(self._game,
+                                                   self._think_ms / 1000)
         chosen_move = random.choice(list(moves))
         return chosen_move[0], chosen_move[1]
 
-    def abminimax(self, game, depth, alpha, beta, is_maximizing):
+    def new_search(self):
+        """
+        Prepares the bot for searching a new position: ages the
+        transposition table and the history scores, and forgets the killer
+        moves and best move of the previous position.
+
+        Returns: None
+        """
+        if self._tt is not None:
+            self._tt.new_search()
+        self._history = {code: score // 2
+                         for code, score in self._history.items() if score > 1}
+        self._killers = []
+        self._root_move = None
+        self._generation += 1
+
+    def close(self):
         """
-        Alpha-beta pruning minimax algorithm.
+        Shuts down the worker processes, if any were started, and frees the
+        shared transposition table.
+
+        Returns: None
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._lazy_smp:
+            self._tt.close()
+
+    def iterative_deepening(self, game, budget):
+        """
+        Searches deeper and deeper until the time budget runs out. A search
+        that runs out of time is abandoned, and the game is left as it was
+        found. The search to depth 1 always completes.
+
+        Parameters:
+            game: Checkers: game of checkers to be played
+            budget: float: time budget in seconds
+
+        Returns: tuple: evaluation score and list of best first jumps or
+                        steps found by the deepest completed search, and
+                        that depth
+        """
+        start = time.perf_counter()
+        self._deadline = None
+        value, moves = self.search(game, 1)
+        depth = 1
+        if len(game.player_sequences()) == 1:
+            # nothing to choose from
+            return value, moves, depth
+        self._deadline = start + budget
+        try:
+            while depth < self.MAX_DEPTH:
+                value, moves = self.aspiration_search(game, depth + 1, value)
+                depth += 1
+        except SearchTimeout:
+            pass
+        finally:
+            self._deadline = None
+        return value, moves, depth
+
+    def aspiration_search(self, game, depth, guess):
+        """
+        Searches the game tree with a window around an expected score,
+        widening it on the side the score falls out of until it falls
+        inside.
+
+        Parameters:
+            game: Checkers: game of checkers to be played
+            depth: int: the maximum depth to which the algorithm should keep
+                        track of plays to
+            guess: float: expected score, such as the score of a shallower
+                          search
+
+        Returns: tuple: as returned by abminimax()
+        """
+        delta = self._aspiration
+        if delta <= 0 or math.isinf(guess):
+            return self.search(game, depth)
+        alpha = guess - delta
+        beta = guess + delta
+        while True:
+            value, moves = self.search(game, depth, alpha, beta)
+            if value <= alpha and alpha > -math.inf:
+                self.stats.fail_lows += 1
+                delta *= 4
+                alpha = value - delta if delta < 100 * self._aspiration \
+                    else -math.inf
+            elif value >= beta and beta < math.inf:
+                self.stats.fail_highs += 1
+                delta *= 4
+                beta = value + delta if delta < 100 * self._aspiration \
+                    else math.inf
+            else:
+                return value, moves
+
+    def search(self, game, depth, alpha=-math.inf, beta=math.inf):
+        """
+        Searches the game tree from the current position for the bot, with
+        the worker processes if it has any and the search is deep enough and
+        the root has enough moves to share out.
+
+        Parameters:
+            game: Checkers: game of checkers to be played
+            depth: int: the maximum depth to which the algorithm should keep
+                        track of plays to
+            alpha: float: number for alpha
+            beta: float: number for beta
+
+        Returns: tuple: as returned by abminimax()
+        """
+        if (self._workers > 1 and depth >= self.PARALLEL_DEPTH
+                and len(game.player_sequences()) >= self.PARALLEL_MOVES):
+            if self._pool is None:
+                self._start_workers()
+            if self._lazy_smp:
+                return self.lazy_smp_root(game, depth, alpha, beta)
+            return self.parallel_root(game, depth, alpha, beta)
+        return self.abminimax(game, depth, alpha, beta, True, True)
+
+    def _start_workers(self):
+        """
+        Starts the worker processes.
+
+        Returns: None
+        """
+        self._shared_alpha = multiprocessing.Value('d', -math.inf)
+        self._workers_stop = multiprocessing.Value('b', False)
+        tt_name = None
+        workers = self._workers
+        # workers searching their own moves of the root split the memory
+        # budget of the table between them
+        tt_mb = self._tt_mb / workers
+        if self._lazy_smp:
+            # the bot searches alongside the workers
+            tt_name = self._tt.get_name()
+            workers -= 1
+        self._pool = ProcessPoolExecutor(
+            workers, initializer=_init_worker,
+            initargs=(self._player, self._opponent, tt_mb,
+                      {"ordering": self._ordering,
+                       "quiescence": self._quiescence, "pvs": self._pvs,
+                       "lmr": self._lmr, "futility": self._futility,
+                       "razoring": self._razoring},
+                      self._shared_alpha, self._workers_stop, tt_name))
+
+    def _out_of_time(self):
+        """
+        Returns whether the search has to stop, because its time budget ran
+        out or it was told to.
+
+        Returns: bool: whether to stop
+        """
+        return (time.perf_counter() > self._deadline
+                or (self._stop is not None and self._stop.value))
+
+    def abminimax(self, game, depth, alpha, beta, is_maximizing, root=False):
+        """
+        Alpha-beta pruning minimax algorithm. Multiple jumps are searched as a
+        single move. Moves are made and undone on the game itself, which is
+        left as it was found once the search returns. Moves back to a position
+        already seen in the game or in the search are not searched further.
 
         Parameters:
             game: Checkers: game of checkers to be played
@@ -116,53 +485,435 @@ class SmartBot:
             is_maximizing: bool: whether the player that is currently in
                                     consideration wants to maximize the
                                     evaluation score of the board
+            root: bool: whether the moves of this position are needed, in
+                        which case it is searched even if the transposition
+                        table already knows its score
 
         Returns: tuple: tuple of most favorable evaluation score for the
                         player currently in consideration and a list of the
-                        initial move(s) that leads to that favored game state.
+                        first jump or step of the move(s) that leads to that
+                        favored game state.
         """
-        if depth == 0 or game._game_over:
+        self.stats.nodes += 1
+        if (self._deadline is not None
+                and self.stats.nodes % self.CLOCK_NODES == 0
+                and self._out_of_time()):
+            raise SearchTimeout()
+        if game._game_over:
+            return self.evaluation(game), []
+        if depth == 0:
+            if self._quiescence:
+                return self.quiescence(game, alpha, beta, is_maximizing), []
             return self.evaluation(game), []
+
+        tt = self._tt
+        tt_move = self._root_move if root else None
+        if tt is not None:
+            key = game.position_key()
+            entry = tt.probe(key)
+            if entry is not None:
+                tt_depth, bound, score, stored_move = entry
+                if tt_depth >= depth and not root:
+                    if (bound == EXACT or (bound == LOWER and score >= beta)
+                            or (bound == UPPER and score <= alpha)):
+                        return score, []
+                if stored_move is not None:
+                    tt_move = stored_move
+
+        if depth <= 2 and not root:
+            pruned = self.prune(game, depth, alpha, beta, is_maximizing)
+            if pruned is not None:
+                return pruned, []
+
+        sequences = self.order_sequences(game.player_sequences(), tt_move)
+        alpha_orig, beta_orig = alpha, beta
+
+        best_moves = []
+        best_path = None
+        cutoff = None
         if is_maximizing:
             maxEval = -math.inf
-            best_moves = []
-            for m in game.player_moves():
-                curr_pos, dest, _ = m
-                gamecopy = copy.deepcopy(game)
-                gamecopy.move(curr_pos, dest)
-                if gamecopy.get_turn() == self._player:
-                    value = self.abminimax(
-                        gamecopy, depth, alpha, beta, True)[0]
-                else:
-                    value = self.abminimax(
-                        gamecopy, depth-1, alpha, beta, False)[0]
-                maxEval = max(maxEval, value)
-                if maxEval == value:
+            for index, sequence in enumerate(sequences):
+                path, _ = sequence
+                curr_pos, dest = path[0], path[1]
+                records = game.apply_sequence(sequence)
+                self._ply += 1
+                try:
+                    value = self.search_move(game, depth, alpha, beta, True,
+                                             index, len(sequence[1]) == 0)
+                finally:
+                    self._ply -= 1
+                    game.undo_sequence(records)
+                if value > maxEval or best_path is None:
+                    maxEval = value
+                    best_moves = [(curr_pos, dest)]
+                    best_path = path
+                elif value == maxEval:
                     best_moves.append((curr_pos, dest))
                 alpha = max(alpha, maxEval)
                 if beta <= alpha:
+                    cutoff = index
                     break
-            return maxEval, best_moves
+            value = maxEval
         else:
             minEval = math.inf
-            best_moves = []
-            for m in game.player_moves():
-                curr_pos, dest, _ = m
-                gamecopy = copy.deepcopy(game)
-                gamecopy.move(curr_pos, dest)
-                if gamecopy.get_turn() == self._opponent:
-                    value = self.abminimax(
-                        gamecopy, depth, alpha, beta, False)[0]
-                else:
-                    value = self.abminimax(
-                        gamecopy, depth-1, alpha, beta, True)[0]
-                minEval = min(minEval, value)
-                if minEval == value:
+            for index, sequence in enumerate(sequences):
+                path, _ = sequence
+                curr_pos, dest = path[0], path[1]
+                records = game.apply_sequence(sequence)
+                self._ply += 1
+                try:
+                    value = self.search_move(game, depth, alpha, beta, False,
+                                             index, len(sequence[1]) == 0)
+                finally:
+                    self._ply -= 1
+                    game.undo_sequence(records)
+                if value < minEval or best_path is None:
+                    minEval = value
+                    best_moves = [(curr_pos, dest)]
+                    best_path = path
+                elif value == minEval:
                     best_moves.append((curr_pos, dest))
                 beta = min(beta, minEval)
                 if beta <= alpha:
+                    cutoff = index
                     break
-            return minEval, best_moves
+            value = minEval
+
+        if best_path is None:
+            return value, best_moves
+        best_move = encode_path(best_path)
+        if cutoff is not None:
+            self.stats.record_cutoff(cutoff)
+            if len(sequences[cutoff][1]) == 0:
+                self.record_quiet_cutoff(best_move, depth)
+        if root:
+            self._root_move = best_move
+        if tt is not None:
+            if value <= alpha_orig:
+                bound = UPPER
+            elif value >= beta_orig:
+                bound = LOWER
+            else:
+                bound = EXACT
+            tt.store(key, depth, bound, value, best_move)
+        return value, best_moves
+
+    def search_move(self, game, depth, alpha, beta, is_maximizing, index,
+                    quiet):
+        """
+        Searches the position reached by a move, with principal variation
+        search and late move reductions if enabled.
+
+        Parameters:
+            game: Checkers: game after the move
+            depth: int: depth of the position the move was made from
+            alpha: float: number for alpha of that position
+            beta: float: number for beta of that position
+            is_maximizing: bool: whether the player that made the move is
+                                 the maximizing player
+            index: int: index of the move in the order the moves of the
+                        position are searched in
+            quiet: bool: whether the move captures nothing
+
+        Returns: float: evaluation score of the position
+        """
+        if game.repetition_count() > 1:
+            # a cycle: searching on would only repeat positions
+            return self.evaluation(game)
+        if index == 0:
+            return self.abminimax(game, depth-1, alpha, beta,
+                                  not is_maximizing)[0]
+
+        # window of zero width, to find out whether the move is better than
+        # the moves searched so far
+        if is_maximizing:
+            null_alpha, null_beta = alpha, math.nextafter(alpha, math.inf)
+        else:
+            null_alpha, null_beta = math.nextafter(beta, -math.inf), beta
+        if not self._pvs:
+            null_alpha, null_beta = alpha, beta
+
+        if (self._lmr and quiet and index >= self.LMR_MOVES
+                and depth >= self.LMR_DEPTH):
+            # a quiet move ordered late is unlikely to be best, and is first
+            # searched one move less deep
+            self.stats.reductions += 1
+            value = self.abminimax(game, depth-2, null_alpha, null_beta,
+                                   not is_maximizing)[0]
+            if value <= alpha if is_maximizing else value >= beta:
+                return value
+            self.stats.reduction_researches += 1
+
+        if not self._pvs:
+            return self.abminimax(game, depth-1, alpha, beta,
+                                  not is_maximizing)[0]
+        value = self.abminimax(game, depth-1, null_alpha, null_beta,
+                               not is_maximizing)[0]
+        if alpha < value < beta:
+            self.stats.researches += 1
+            value = self.abminimax(game, depth-1, alpha, beta,
+                                   not is_maximizing)[0]
+        return value
+
+    def prune(self, game, depth, alpha, beta, is_maximizing):
+        """
+        Decides whether a position close to the leaves is so far from the
+        window that it does not need to be searched. At depth 1, a position
+        without captures is pruned if its evaluation is more than the value
+        of a man away from the window (futility pruning), since a single
+        quiet move is not expected to win that back. At depth 2, a position
+        more than the value of a king away is only searched for captures,
+        and pruned if that confirms it (razoring).
+
+        Parameters:
+            game: Checkers: game of checkers to be played
+            depth: int: the maximum depth to which the algorithm should keep
+                        track of plays to
+            alpha: float: number for alpha
+            beta: float: number for beta
+            is_maximizing: bool: whether the player to move is the bot
+
+        Returns: float: evaluation score to return for the position, None if
+                        it has to be searched
+        """
+        if depth == 1 and self._futility:
+            moves = game.player_moves()
+            if len(moves) > 0 and moves[0][2] is None:
+                static = self.evaluation(game)
+                if (static + self.FUTILITY_MARGIN <= alpha if is_maximizing
+                        else static - self.FUTILITY_MARGIN >= beta):
+                    self.stats.futility_prunes += 1
+                    return static
+        elif depth == 2 and self._razoring:
+            static = self.evaluation(game)
+            if (static + self.RAZOR_MARGIN <= alpha if is_maximizing
+                    else static - self.RAZOR_MARGIN >= beta):
+                value = static
+                if self._quiescence:
+                    value = self.quiescence(game, alpha, beta, is_maximizing)
+                if value <= alpha if is_maximizing else value >= beta:
+                    self.stats.razor_prunes += 1
+                    return value
+        return None
+
+    def parallel_root(self, game, depth, alpha, beta):
+        """
+        Searches the root of the game tree with the worker processes, for the
+        bot as the maximizing player. The first move is searched here to get
+        a score to beat (young brothers wait), then the other moves are
+        searched by the workers, each starting from the best score found so
+        far by any of them.
+
+        Parameters:
+            game: Checkers: game of checkers to be played
+            depth: int: the maximum depth to which the algorithm should keep
+                        track of plays to
+            alpha: int: number for alpha
+            beta: int: number for beta
+
+        Returns: tuple: as returned by abminimax()
+        """
+        tt = self._tt
+        tt_move = self._root_move
+        if tt is not None:
+            key = game.position_key()
+            entry = tt.probe(key)
+            if entry is not None and entry[3] is not None:
+                tt_move = entry[3]
+        sequences = self.order_sequences(game.player_sequences(), tt_move)
+
+        results = []
+        records = game.apply_sequence(sequences[0])
+        self._ply += 1
+        try:
+            if game.repetition_count() > 1:
+                value = self.evaluation(game)
+            else:
+                value = self.abminimax(game, depth-1, alpha, beta, False)[0]
+        finally:
+            self._ply -= 1
+            game.undo_sequence(records)
+        results.append(value)
+        self._shared_alpha.value = max(alpha, value)
+
+        try:
+            for sequence in sequences[1:]:
+                records = game.apply_sequence(sequence)
+                try:
+                    if game.repetition_count() > 1:
+                        results.append(self.evaluation(game))
+                    else:
+                        results.append(self._pool.submit(
+                            _search_child, game.snapshot(),
+                            array('Q', game._key_history), depth-1,
+                            self._generation, self._deadline))
+                finally:
+                    game.undo_sequence(records)
+            for k, result in enumerate(results):
+                if isinstance(result, Future):
+                    value, nodes, qnodes = result.result()
+                    self.stats.nodes += nodes
+                    self.stats.qnodes += qnodes
+                    if value is None:
+                        raise SearchTimeout()
+                    results[k] = value
+        finally:
+            for result in results:
+                if isinstance(result, Future):
+                    result.cancel()
+
+        maxEval = -math.inf
+        best_moves = []
+        best_path = None
+        for sequence, value in zip(sequences, results):
+            path = sequence[0]
+            if value > maxEval or best_path is None:
+                maxEval = value
+                best_moves = [(path[0], path[1])]
+                best_path = path
+            elif value == maxEval:
+                best_moves.append((path[0], path[1]))
+
+        best_move = encode_path(best_path)
+        self._root_move = best_move
+        if tt is not None:
+            if maxEval <= alpha:
+                bound = UPPER
+            elif maxEval >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            tt.store(key, depth, bound, maxEval, best_move)
+        return maxEval, best_moves
+
+    def lazy_smp_root(self, game, depth, alpha, beta):
+        """
+        Searches the game tree together with the worker processes, which
+        search the same tree, half of them one move deeper, and store what
+        they find in the shared transposition table for the bot and each
+        other to use. The bot's own search gives the result, and the workers
+        stop when it completes.
+
+        Parameters:
+            game: Checkers: game of checkers to be played
+            depth: int: the maximum depth to which the algorithm should keep
+                        track of plays to
+            alpha: float: number for alpha
+            beta: float: number for beta
+
+        Returns: tuple: as returned by abminimax()
+        """
+        self._workers_stop.value = False
+        state = game.snapshot()
+        keys = array('Q', game._key_history)
+        helpers = [self._pool.submit(_search_root, state, keys,
+                                     depth + k % 2, self._generation,
+                                     self._deadline)
+                   for k in range(1, self._workers)]
+        try:
+            return self.abminimax(game, depth, alpha, beta, True, True)
+        finally:
+            self._workers_stop.value = True
+            for helper in helpers:
+                nodes, qnodes = helper.result()
+                self.stats.nodes += nodes
+                self.stats.qnodes += qnodes
+
+    def quiescence(self, game, alpha, beta, is_maximizing):
+        """
+        Searches captures only, until neither player has one to make, and
+        evaluates the quiet positions reached.
+
+        Parameters:
+            game: Checkers: game of checkers to be played
+            alpha: float: best score the maximizing player is assured of
+            beta: float: best score the minimizing player is assured of
+            is_maximizing: bool: whether the player to move is the bot
+
+        Returns: float: evaluation score
+        """
+        self.stats.qnodes += 1
+        if (self._deadline is not None
+                and self.stats.qnodes % self.CLOCK_NODES == 0
+                and self._out_of_time()):
+            raise SearchTimeout()
+        if game._game_over:
+            return self.evaluation(game)
+        moves = game.player_moves()
+        if len(moves) == 0 or moves[0][2] is None:
+            # quiet
+            return self.evaluation(game)
+
+        sequences = self.order_sequences(game.player_sequences())
+        value = -math.inf if is_maximizing else math.inf
+        for sequence in sequences:
+            records = game.apply_sequence(sequence)
+            try:
+                score = self.quiescence(game, alpha, beta, not is_maximizing)
+            finally:
+                game.undo_sequence(records)
+            if is_maximizing:
+                value = max(value, score)
+                alpha = max(alpha, value)
+            else:
+                value = min(value, score)
+                beta = min(beta, value)
+            if beta <= alpha:
+                break
+        return value
+
+    def order_sequences(self, sequences, tt_move=None):
+        """
+        Orders moves so that the ones most likely to be best come first,
+        using the enabled ordering stages.
+
+        Parameters:
+            sequences: List[Tuple]: moves as returned by player_sequences()
+            tt_move: int: encoded best move of an earlier search of the
+                          position, None if unknown
+
+        Returns: List[Tuple]: the moves, best first
+        """
+        if len(sequences) < 2:
+            return sequences
+        if not self._order_tt:
+            tt_move = None
+        killers = ()
+        if self._order_killers and self._ply < len(self._killers):
+            killers = self._killers[self._ply]
+        history = self._history if self._order_history else {}
+        captures = self._order_captures
+
+        def priority(sequence):
+            code = encode_path(sequence[0])
+            return (code == tt_move,
+                    len(sequence[1]) if captures else 0,
+                    code in killers,
+                    history.get(code, 0))
+
+        return sorted(sequences, key=priority, reverse=True)
+
+    def record_quiet_cutoff(self, move, depth):
+        """
+        Remembers a move that is not a capture and caused a cutoff, as a
+        killer move of the current ply and in the history scores.
+
+        Parameters:
+            move: int: encoded move
+            depth: int: depth the position was searched to
+
+        Returns: None
+        """
+        if self._order_killers:
+            while len(self._killers) <= self._ply:
+                self._killers.append([])
+            killers = self._killers[self._ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[2:]
+        if self._order_history:
+            self._history[move] = self._history.get(move, 0) + depth * depth
 
     def evaluation(self, game):
         """
@@ -174,56 +925,147 @@ class SmartBot:
 
         Returns: int: evaluation score
         """
-        bot_score = 0
-        opp_score = 0
-        bot_potential = 0
-        opp_potential = 0
         if game._winner == self._player:
             return math.inf
         elif game._winner == self._opponent:
             return -math.inf
         else:
-            if self._player == Player.TOP:
-                for p in game._p1:
-                    if p.is_king():
-                        bot_score += 5000
-                    else:
-                        bot_score += 3000
-                        row, _ = p.get_pos()
-                        bot_potential += row
-                for p in game._p2:
-                    if p.is_king():
-                        opp_score += 5000
-                    else:
-                        opp_score += 3000
-                        row, _ = p.get_pos()
-                        opp_potential += (game._board.height() - row)
-                bot_potential = (bot_potential / len(game._p1)) * 10
-                opp_potential = (opp_potential / len(game._p2)) * 10
-                bot_score += bot_potential
-                opp_score += opp_potential
-            else:
-                for p in game._p1:
-                    if p.is_king():
-                        opp_score += 5000
-                    else:
-                        opp_score += 3000
-                        row, _ = p.get_pos()
-                        opp_potential += row
-                for p in game._p2:
-                    if p.is_king():
-                        bot_score += 5000
-                    else:
-                        bot_score += 3000
-                        row, _ = p.get_pos()
-                        bot_potential += (game._board.height() - row)
-                bot_potential = (bot_potential / len(game._p1)) * 10
-                opp_potential = (opp_potential / len(game._p2)) * 10
-                bot_score += bot_potential
-                opp_score += opp_potential
+            # material and advancement are kept up to date by the game
+            men = game._men
+            kings = game._kings
+            advancement = game._advancement
+            p1_pieces = men[0] + kings[0]
+            p2_pieces = men[1] + kings[1]
+            bot = self._player.value
+            opp = self._opponent.value
+            bot_score = 5000 * kings[bot] + 3000 * men[bot]
+            opp_score = 5000 * kings[opp] + 3000 * men[opp]
+            bot_potential = (advancement[bot] / p1_pieces) * 10
+            opp_potential = (advancement[opp] / p2_pieces) * 10
+            bot_score += bot_potential
+            opp_score += opp_potential
             return bot_score - opp_score
 
 
+# bot and shared best score of a search worker process
+_worker = {}
+
+
+def _init_worker(player, opponent, tt_mb, settings, alpha, stop, tt_name):
+    """
+    Sets up a search worker process of SmartBot.
+
+    Parameters:
+      player: bot's player identity
+      opponent: opponent's player identity
+      tt_mb: float: memory budget of the worker's transposition table
+      settings: dict: search settings of the bot, as keyword arguments of
+                      SmartBot
+      alpha: multiprocessing.Value: best score found so far by the search
+      stop: multiprocessing.Value: set when the search has to stop
+      tt_name: str: name of the shared transposition table, None for the
+                    worker to use a table of its own
+
+    Returns: None
+    """
+    bot = SmartBot(None, player, opponent, tt_mb=0 if tt_name else tt_mb,
+                   **settings)
+    if tt_name is not None:
+        bot._tt = SharedTranspositionTable(name=tt_name)
+    bot._stop = stop
+    _worker["bot"] = bot
+    _worker["alpha"] = alpha
+    _worker["generation"] = None
+
+
+def _load_position(state, keys, generation):
+    """
+    Sets up a position to search in a worker process.
+
+    Parameters:
+      state: GameState: the position
+      keys: array: position keys of the game before it, to detect repetitions
+      generation: int: number of the bot's search, the worker starts a new
+                       search when it changes
+
+    Returns: Checkers: game in the position
+    """
+    bot = _worker["bot"]
+    if generation != _worker["generation"]:
+        bot.new_search()
+        _worker["generation"] = generation
+
+    game = Checkers.from_snapshot(state)
+    game._key_history = keys
+    for key in keys:
+        game._key_counts[key] = game._key_counts.get(key, 0) + 1
+    return game
+
+
+def _search_root(state, keys, depth, generation, deadline):
+    """
+    Searches the position of the bot, in a worker process helping a lazy SMP
+    search, until the search is told to stop.
+
+    Parameters:
+      state: GameState: the position, with the bot to move
+      keys: array: position keys of the game before it, to detect repetitions
+      depth: int: depth to search the position to
+      generation: int: number of the bot's search, the worker starts a new
+                       search when it changes
+      deadline: float: time.perf_counter() value by which to give up, None
+                       for no time limit
+
+    Returns: tuple: the nodes and quiescence nodes searched
+    """
+    bot = _worker["bot"]
+    game = _load_position(state, keys, generation)
+    bot.stats.reset()
+    bot._deadline = math.inf if deadline is None else deadline
+    try:
+        bot.abminimax(game, depth, -math.inf, math.inf, True, True)
+    except SearchTimeout:
+        pass
+    finally:
+        bot._deadline = None
+    return bot.stats.nodes, bot.stats.qnodes
+
+
+def _search_child(state, keys, depth, generation, deadline):
+    """
+    Searches a position reached by a move from the root, in a worker process.
+
+    Parameters:
+      state: GameState: the position, with the opponent to move
+      keys: array: position keys of the game before it, to detect repetitions
+      depth: int: depth to search the position to
+      generation: int: number of the bot's search, the worker starts a new
+                       search when it changes
+      deadline: float: time.perf_counter() value by which to give up, None
+                       for no time limit
+
+    Returns: tuple: score of the position (None if the time ran out), and
+                    the nodes and quiescence nodes searched
+    """
+    bot = _worker["bot"]
+    shared_alpha = _worker["alpha"]
+    game = _load_position(state, keys, generation)
+    bot.stats.reset()
+    bot._deadline = deadline
+    try:
+        value = bot.abminimax(game, depth, shared_alpha.value, math.inf,
+                              False)[0]
+    except SearchTimeout:
+        value = None
+    finally:
+        bot._deadline = None
+    if value is not None:
+        with shared_alpha.get_lock():
+            if value > shared_alpha.value:
+                shared_alpha.value = value
+    return value, bot.stats.nodes, bot.stats.qnodes
+
+
 #
 # SIMULATION CODE
 #
@@ -233,7 +1075,11 @@ class BotPlayer:
     Simple class to store information about a bot player in a simulation
     """
 
-    def __init__(self, name, game, bot_player, opp_player):
+    def __init__(self, name, game, bot_player, opp_player, tt_mb=16,
+                 think_ms=None, ordering=ORDERING, depth=5, quiescence=True,
+                 workers=1, shared_tt=False, pvs=True,
+                 aspiration=SmartBot.ASPIRATION, lmr=True, futility=True,
+                 razoring=True):
         """
         Constructor
 
@@ -242,17 +1088,38 @@ class BotPlayer:
           game: Checkers: the game of checkers to play on
           bot_player: Player: bot's player identity
           opp_player: Player: opponent's player identity
+          tt_mb: float: transposition table size of a smart bot in megabytes
+          think_ms: float: time budget per move of a smart bot in
+                    milliseconds, None to search to a fixed depth
+          ordering: Tuple(str): move ordering stages of a smart bot
+          depth: int: search depth of a smart bot without a time budget
+          quiescence: bool: whether a smart bot searches captures beyond
+                      its depth
+          workers: int: number of processes searching for a smart bot
+          shared_tt: bool: whether the processes of a smart bot share its
+                     transposition table
+          pvs: bool: whether a smart bot uses principal variation search
+          aspiration: float: half width of the first aspiration window of a
+                      smart bot
+          lmr: bool: whether a smart bot uses late move reductions
+          futility: bool: whether a smart bot uses futility pruning
+          razoring: bool: whether a smart bot uses razoring
         """
         self.name = name
         if self.name == "random":
             self.bot = RandomBot(game, bot_player, opp_player)
         elif self.name == "smart":
-            self.bot = SmartBot(game, bot_player, opp_player)
+            self.bot = SmartBot(game, bot_player, opp_player, tt_mb=tt_mb,
+                                think_ms=think_ms, ordering=ordering,
+                                depth=depth, quiescence=quiescence,
+                                workers=workers, shared_tt=shared_tt,
+                                pvs=pvs, aspiration=aspiration, lmr=lmr,
+                                futility=futility, razoring=razoring)
         self.player = bot_player
         self.wins = 0
 
 
-def simulate(game, n, bots):
+def simulate(game, n, bots, pdn=None, archive=None):
     """
     Simulates multiple games between two bots
 
@@ -261,10 +1128,13 @@ def simulate(game, n, bots):
       n: int: the number of matches to play
       bots: dict: dictionary mapping player identities to BotPlayer objects (the
                     bots that will face off in each match)
+      pdn: PDNWriter: writer to log every finished game to, if not None
+      archive: ArchiveWriter: archive to store every finished game in, if
+                    not None
 
     Returns: None
     """
-    for _ in range(n):
+    for i in range(n):
         game.new_game()
 
         while not game._game_over:
@@ -277,6 +1147,13 @@ def simulate(game, n, bots):
         if game._winner is not None:
             bots[game._winner].wins += 1
 
+        if pdn is not None:
+            pdn.write_game(game, {"Event": "checkers-bot", "Round": i + 1,
+                                  "Black": bots[Player.TOP].name,
+                                  "White": bots[Player.BOTTOM].name})
+        if archive is not None:
+            archive.write_game(game)
+
 
 @ click.command(name="checkers-bot")
 @ click.option('-n', '--num-games', type=click.INT, default=100)
@@ -284,15 +1161,73 @@ def simulate(game, n, bots):
                                               case_sensitive=False), default="random")
 @ click.option('--player2', type=click.Choice(['random', 'smart'],
                                               case_sensitive=False), default="random")
-def cmd(num_games, player1, player2):
-    board = Checkers(3)
+@ click.option('--engine', type=click.Choice(['checkers', 'bitboard'],
+                                             case_sensitive=False), default="checkers")
+@ click.option('--pdn', type=click.Path(dir_okay=False), default=None,
+               help="PDN file to append every finished game to")
+@ click.option('--archive', type=click.Path(dir_okay=False), default=None,
+               help="binary game archive to write the games to")
+@ click.option('--tt-mb', type=click.FLOAT, default=16,
+               help="transposition table size of smart bots in megabytes "
+                    "(0 to disable)")
+@ click.option('--think-ms', type=click.FLOAT, default=None,
+               help="time budget per move of smart bots in milliseconds "
+                    "(searches to --depth if not given)")
+@ click.option('--depth', type=click.IntRange(1), default=5,
+               help="search depth of smart bots without a time budget")
+@ click.option('--quiescence/--no-quiescence', default=True,
+               help="whether smart bots search captures beyond their depth")
+@ click.option('--pvs/--no-pvs', default=True,
+               help="whether smart bots use principal variation search")
+@ click.option('--aspiration', type=click.FloatRange(0),
+               default=SmartBot.ASPIRATION,
+               help="half width of the first aspiration window of smart bots "
+                    "with --think-ms (0 to search with a full window)")
+@ click.option('--lmr/--no-lmr', default=True,
+               help="whether smart bots use late move reductions")
+@ click.option('--futility/--no-futility', default=True,
+               help="whether smart bots use futility pruning")
+@ click.option('--razoring/--no-razoring', default=True,
+               help="whether smart bots use razoring")
+@ click.option('--no-order', type=click.Choice(ORDERING), multiple=True,
+               help="move ordering stage of smart bots to turn off "
+                    "(can be repeated)")
+@ click.option('--search-stats', is_flag=True, default=False,
+               help="show how many nodes smart bots searched and how well "
+                    "their cutoffs landed")
+def cmd(num_games, player1, player2, engine, pdn, archive, tt_mb, think_ms,
+        depth, quiescence, pvs, aspiration, lmr, futility, razoring,
+        no_order, search_stats):
+    if engine == "bitboard":
+        if "smart" in (player1, player2):
+            raise click.BadParameter("smart bots need the checkers engine",
+                                     param_hint="--engine")
+        board = BitboardCheckers(3)
+    else:
+        board = Checkers(3)
 
-    bot1 = BotPlayer(player1, board, Player.TOP, Player.BOTTOM)
-    bot2 = BotPlayer(player2, board, Player.BOTTOM, Player.TOP)
+    ordering = tuple(stage for stage in ORDERING if stage not in no_order)
+    settings = {"tt_mb": tt_mb, "think_ms": think_ms, "ordering": ordering,
+                "depth": depth, "quiescence": quiescence, "pvs": pvs,
+                "aspiration": aspiration, "lmr": lmr, "futility": futility,
+                "razoring": razoring}
+    bot1 = BotPlayer(player1, board, Player.TOP, Player.BOTTOM, **settings)
+    bot2 = BotPlayer(player2, board, Player.BOTTOM, Player.TOP, **settings)
 
     bots = {Player.TOP: bot1, Player.BOTTOM: bot2}
 
-    simulate(board, num_games, bots)
+    pdn_writer = PDNWriter(pdn) if pdn is not None else None
+    archive_writer = ArchiveWriter(archive) if archive is not None else None
+    try:
+        simulate(board, num_games, bots, pdn_writer, archive_writer)
+    finally:
+        if pdn_writer is not None:
+            pdn_writer.close()
+        if archive_writer is not None:
+            archive_writer.close()
+        for bot in (bot1, bot2):
+            if isinstance(bot.bot, SmartBot):
+                bot.bot.close()
 
     bot1_wins = bots[Player.TOP].wins
     bot2_wins = bots[Player.BOTTOM].wins
@@ -302,6 +1237,11 @@ def cmd(num_games, player1, player2):
     print(f"Bot 2 ({player2}) wins: {100 * bot2_wins / num_games:.2f}%")
     print(f"Ties: {100 * ties / num_games:.2f}%")
 
+    if search_stats:
+        for i, bot in enumerate((bot1, bot2)):
+            if isinstance(bot.bot, SmartBot):
+                print(f"Bot {i + 1} ({bot.name}) search: {bot.bot.stats}")
+
 
 if __name__ == "__main__":
     cmd()
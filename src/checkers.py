@@ -1,4 +1,6 @@
 import random
+import struct
+from array import array
 from enum import Enum
 
 
@@ -7,6 +9,181 @@ class Player(Enum):
     BOTTOM = 1
 
 
+# directions (row, col) a piece can move in: NW, NE, SW, SE
+_KING_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+_TOP_DIRECTIONS = ((1, -1), (1, 1))
+_BOTTOM_DIRECTIONS = ((-1, -1), (-1, 1))
+
+# letters of the players in FEN notation
+_FEN_COLORS = {Player.TOP: 'B', Player.BOTTOM: 'W'}
+_FEN_PLAYERS = {'B': Player.TOP, 'W': Player.BOTTOM}
+
+# characters of pieces in the render buffer, indexed by player and king
+# status, when the top player started the game
+_PIECE_CHARS = ((ord('b'), ord('B')), (ord('r'), ord('R')))
+_EMPTY_CHAR = ord('_')
+# swaps the colours of a rendered board when the bottom player started
+_SWAP_COLORS = str.maketrans('bBrR', 'rRbB')
+
+# move tables are shared by all games of the same size
+_MOVE_TABLES = {}
+
+
+def dark_index(pos, n):
+    """
+    Returns the number of a dark square, counting the dark squares row by row
+    from 0, as snapshots, FEN, PDN and game archives number them.
+
+    Parameters:
+        pos: Tuple(int): tuple of row and column of the square
+        n: int: the number of rows of pieces a player starts with
+
+    Returns: int: number of the square
+    """
+    return pos[0] * (n + 1) + pos[1] // 2
+
+
+def dark_position(index, n):
+    """
+    Returns the position of a dark square from its number, the inverse of
+    dark_index.
+
+    Parameters:
+        index: int: number of the square
+        n: int: the number of rows of pieces a player starts with
+
+    Returns: Tuple(int): tuple of row and column of the square
+    """
+    i = index // (n + 1)
+    return i, 2 * (index % (n + 1)) + (i + 1) % 2
+
+
+def _move_tables(n):
+    """
+    Returns the precomputed neighbours of every square of a board of size n,
+    so that move generation needs no bounds checks or coordinate arithmetic.
+
+    Parameters:
+        n: int: the number of rows of pieces a player starts with
+
+    Returns:
+        Tuple: tables for top pieces, bottom pieces and kings. Each table is
+            indexed by square index (row * width + col) and holds, for every
+            direction the piece can step in without leaving the board, a
+            tuple of the square index and position stepped onto, and the
+            square index and position landed on when jumping (-1 and None
+            if a jump would leave the board).
+    """
+    if n not in _MOVE_TABLES:
+        size = 2 * n + 2
+        tables = []
+        for directions in (_TOP_DIRECTIONS, _BOTTOM_DIRECTIONS,
+                           _KING_DIRECTIONS):
+            table = []
+            for i in range(size):
+                for j in range(size):
+                    entries = []
+                    for di, dj in directions:
+                        if not (0 <= i + di < size and 0 <= j + dj < size):
+                            continue
+                        step = (i + di) * size + j + dj
+                        if (0 <= i + 2 * di < size and
+                                0 <= j + 2 * dj < size):
+                            land_pos = (i + 2 * di, j + 2 * dj)
+                            land = land_pos[0] * size + land_pos[1]
+                        else:
+                            land_pos = None
+                            land = -1
+                        entries.append((step, (i + di, j + dj), land,
+                                        land_pos))
+                    table.append(tuple(entries))
+            tables.append(tuple(table))
+        _MOVE_TABLES[n] = tuple(tables)
+    return _MOVE_TABLES[n]
+
+
+# Zobrist keys are shared by all games of the same size
+_ZOBRIST = {}
+
+
+def _zobrist_keys(n):
+    """
+    Returns the random 64-bit keys used to hash positions of a board of size n.
+    Keys are drawn from a generator seeded with n, so they are the same in
+    every process.
+
+    Parameters:
+        n: int: the number of rows of pieces a player starts with
+
+    Returns:
+        Tuple: piece keys indexed by [player value][is king][row][col], the
+            key for BOTTOM to move, and the keys for a multi-jump continuing
+            from a square, indexed by [row][col]
+    """
+    if n not in _ZOBRIST:
+        rng = random.Random(n)
+        size = 2 * n + 2
+        pieces = [[[[rng.getrandbits(64) for _ in range(size)]
+                    for _ in range(size)] for _ in range(2)]
+                  for _ in range(2)]
+        side = rng.getrandbits(64)
+        jumps = [[rng.getrandbits(64) for _ in range(size)]
+                 for _ in range(size)]
+        _ZOBRIST[n] = (pieces, side, jumps)
+    return _ZOBRIST[n]
+
+
+# pieces of the cell values of snapshots and FEN loading: player and king
+# status of 1 (top piece), 2 (bottom piece), 3 (top king) and 4 (bottom king)
+_CELL_PIECES = (None, (Player.TOP, False), (Player.BOTTOM, False),
+                (Player.TOP, True), (Player.BOTTOM, True))
+
+# placement tables are shared by all games of the same size
+_PLACEMENTS = {}
+
+
+def _placement_tables(n):
+    """
+    Returns what placing a piece on each dark square of a board of size n
+    changes, so that a whole position can be set up in a single pass.
+
+    Parameters:
+        n: int: the number of rows of pieces a player starts with
+
+    Returns:
+        Tuple: the placements, indexed by dark square (numbered row by row
+            from 0) and then by cell value (1 to 4, see _CELL_PIECES), and the
+            render buffer of an empty board. A placement is a tuple of the
+            row, column, square index and render buffer offset of the
+            square, the player, king status, owner byte and render character
+            of the piece, its Zobrist key, its player value and how far it
+            has advanced (0 for a king).
+    """
+    if n not in _PLACEMENTS:
+        size = 2 * n + 2
+        pieces = _zobrist_keys(n)[0]
+        squares = []
+        for k in range(size * size // 2):
+            i, j = dark_position(k, n)
+            entries = [None]
+            for player, king in _CELL_PIECES[1:]:
+                side = player.value
+                if king:
+                    advance = 0
+                elif player == Player.TOP:
+                    advance = i
+                else:
+                    advance = size - i
+                entries.append((i, j, i * size + j, i * (2 * size + 2)
+                                + 2 * j + 1, player, king, side + 1,
+                                _PIECE_CHARS[side][king],
+                                pieces[side][king][i][j], side, advance))
+            squares.append(tuple(entries))
+        blank = bytes(b'|_' * size + b'|\n') * size
+        _PLACEMENTS[n] = (tuple(squares), blank)
+    return _PLACEMENTS[n]
+
+
 class Checkers:
     """
     Class for representing the systems interface for a game of Checkers, that
@@ -25,6 +202,8 @@ class Checkers:
         # private attributes
         self. _n = n
         self._board = Board(2 * n + 2, 2 * n + 2)
+        self._zobrist = _zobrist_keys(n)
+        self._tables = _move_tables(n)
         self.new_game()
 
     def new_game(self):
@@ -49,6 +228,10 @@ class Checkers:
         self._multjump = []
         self._winner = None
         self.start_turn = t
+        self._history = []
+        self._key_history = array('Q')
+        self._key_counts = {}
+        self._invalidate_moves()
 
         n = self._n
         start = 1
@@ -76,6 +259,377 @@ class Checkers:
                     self._board.add_piece((i, 2 * j + start), piece)
             start = (start + 1) % 2
 
+        self._render_board()
+        self._count_pieces()
+        self._key = self._compute_key()
+
+    def _compute_key(self, piece_key=None):
+        """
+        Computes the Zobrist key of the current position from scratch.
+
+        Parameters:
+            piece_key: int: key of the pieces alone, as returned by
+                _place_pieces(), computed from the pieces if None
+
+        Returns:
+            int: 64-bit key
+        """
+        pieces, side, jumps = self._zobrist
+        key = 0
+        if piece_key is not None:
+            key = piece_key
+        else:
+            for keys, player_pieces in ((pieces[0], self._p1),
+                                        (pieces[1], self._p2)):
+                for piece in player_pieces:
+                    key ^= keys[piece._is_king][piece._row][piece._col]
+        if self._turn == Player.BOTTOM:
+            key ^= side
+        if len(self._multjump) > 0:
+            i, j = self._multjump[0][0]
+            key ^= jumps[i][j]
+        return key
+
+    def position_key(self):
+        """
+        Returns a 64-bit Zobrist key identifying the current position: where
+        the pieces of each player are, which of them are kings, whose turn it
+        is and which piece (if any) has to continue a multi-jump. Equal
+        positions always have equal keys.
+
+        Parameters:
+            None
+
+        Returns:
+            int: 64-bit key
+        """
+        return self._key
+
+    def repetition_count(self):
+        """
+        Returns how many times the current position has occurred in the game
+        so far, counting the current occurrence. Positions are compared by
+        their position keys, and positions before the game was restored
+        from a snapshot or a FEN are not known.
+
+        Parameters:
+            None
+
+        Returns:
+            int: number of occurrences, at least 1
+        """
+        return self._key_counts.get(self._key, 0) + 1
+
+    def snapshot(self):
+        """
+        Returns an immutable snapshot of everything the game tracks: the
+        pieces, the turn, the multi-jump in progress, draw requests, moves
+        since the last capture and the winner.
+
+        Parameters:
+            None
+
+        Returns:
+            GameState: snapshot of the game
+        """
+        n = self._n
+        cells = [0] * (2 * (n + 1) * (n + 1))
+        for piece in self._p1 | self._p2:
+            cells[dark_index((piece._row, piece._col), n)] = (
+                piece._player.value + 1 + 2 * piece._is_king)
+        jumping = self._multjump[0][0] if len(self._multjump) > 0 else None
+        return GameState.pack(n, (self._turn, self.start_turn, self._draw_p1,
+                                  self._draw_p2, self._game_over,
+                                  self._winner, self._last_capture_p1,
+                                  self._last_capture_p2, jumping), cells)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """
+        Creates a game in the state recorded by a snapshot.
+
+        Parameters:
+            state: GameState: snapshot returned by snapshot()
+
+        Returns:
+            Checkers: new game
+        """
+        game = cls.__new__(cls)
+        game._n = state.get_n()
+        game._zobrist = _zobrist_keys(game._n)
+        game._tables = _move_tables(game._n)
+        game._history = []
+        game._key_history = array('Q')
+        game._key_counts = {}
+        game._restore(state)
+        return game
+
+    def _restore(self, state):
+        """
+        Replaces the state of the game by the one recorded in a snapshot of a
+        game of the same size.
+
+        Parameters:
+            state: GameState: snapshot returned by snapshot()
+
+        Returns:
+            None
+        """
+        if state.get_n() != self._n:
+            raise Exception('Snapshot is for a different board size')
+
+        (self._turn, self.start_turn, self._draw_p1, self._draw_p2,
+         self._game_over, self._winner, self._last_capture_p1,
+         self._last_capture_p2, jumping) = state.header()
+        piece_key = self._place_pieces(state.cells())
+
+        self._multjump = []
+        if jumping is not None:
+            self._multjump = [move for move in self._all_piece_moves(jumping)
+                              if move[2] is not None]
+        self._invalidate_moves()
+        self._key = self._compute_key(piece_key)
+
+    def _place_pieces(self, cells):
+        """
+        Replaces the board and the pieces of both players by new ones, and
+        sets up the render buffer and the material counts of the position in
+        the same pass.
+
+        Parameters:
+            cells: List[int]: contents of every dark square, numbered row by
+                row from 0: 0 (empty), 1 (top piece), 2 (bottom piece),
+                3 (top king) or 4 (bottom king)
+
+        Returns:
+            int: Zobrist key of the pieces, for _compute_key()
+        """
+        size = 2 * self._n + 2
+        squares, blank = _placement_tables(self._n)
+        board = Board(size, size)
+        board_cells = board._cells
+        owners = board._owners
+        image = bytearray(blank)
+        pieces = (set(), set())
+        men = [0, 0]
+        kings = [0, 0]
+        advancement = [0, 0]
+        key = 0
+        for k, cell in enumerate(cells):
+            if cell:
+                (i, j, idx, offset, player, king, owner, char, piece_key,
+                 side, advance) = squares[k][cell]
+                piece = Piece(i, j, player)
+                board_cells[idx] = piece
+                owners[idx] = owner
+                image[offset] = char
+                key ^= piece_key
+                pieces[side].add(piece)
+                if king:
+                    piece._is_king = True
+                    kings[side] += 1
+                else:
+                    men[side] += 1
+                    advancement[side] += advance
+
+        self._board = board
+        self._p1, self._p2 = pieces
+        self._image = image
+        self._text = None
+        self._men = men
+        self._kings = kings
+        self._advancement = advancement
+        return key
+
+    def _count_pieces(self):
+        """
+        Recounts the men and kings of each player and how far their men have
+        advanced (the sum over men of the rows they moved towards the
+        opposite side). The counts are indexed by player value and then kept
+        up to date as moves are made and undone.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._men = [0, 0]
+        self._kings = [0, 0]
+        self._advancement = [0, 0]
+        for piece in self._p1 | self._p2:
+            side = piece._player.value
+            if piece._is_king:
+                self._kings[side] += 1
+            else:
+                self._men[side] += 1
+                self._advancement[side] += self._advance(side, piece._row)
+
+    def _advance(self, side, row):
+        """
+        Returns how far a man on a row has advanced.
+
+        Parameters:
+            side: int: value of the player owning the man
+            row: int: row of the man
+
+        Returns:
+            int: the row for the top player, the number of rows from the
+                bottom edge for the bottom player
+        """
+        if side == Player.TOP.value:
+            return row
+        return self._board.height() - row
+
+    def _render_board(self):
+        """
+        Rebuilds the render buffer from the board. The buffer holds the text
+        returned by __str__ as bytes, drawn as if the top player had started
+        the game, and is then kept up to date square by square as moves are
+        made and undone.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        size = self._board.width()
+        image = bytearray(b'|_' * size + b'|\n') * self._board.height()
+        for piece in self._p1 | self._p2:
+            self._render_square(piece.get_pos(), piece, image)
+        self._image = image
+        self._text = None
+
+    def _render_square(self, pos, piece, image=None):
+        """
+        Draws a square of the render buffer.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of the square
+            piece: Piece: piece on the square, None if empty
+            image: bytearray: buffer to draw on, the game's if None
+
+        Returns:
+            None
+        """
+        if image is None:
+            image = self._image
+            self._text = None
+        offset = pos[0] * (2 * self._board.width() + 2) + 2 * pos[1] + 1
+        if piece is None:
+            image[offset] = _EMPTY_CHAR
+        else:
+            image[offset] = _PIECE_CHARS[piece._player.value][piece._is_king]
+
+    def to_fen(self):
+        """
+        Returns the position in PDN FEN notation, e.g. "B:W18,24,K27:B12,16".
+        The first letter is the player to move, followed by the squares of
+        the men and kings (prefixed with K) of each player. B is the top
+        player and W the bottom player, and dark squares are numbered from 1
+        row by row starting at the top left. A multi-jump in progress, draw
+        requests and move counts are not recorded.
+
+        Parameters:
+            None
+
+        Returns:
+            str: position in FEN notation
+        """
+        n = self._n
+        squares = ([], [])
+        for piece in self._p1 | self._p2:
+            squares[piece.get_player().value].append(
+                (dark_index(piece.get_pos(), n) + 1, piece.is_king()))
+
+        fields = []
+        for player in (Player.BOTTOM, Player.TOP):
+            fields.append(_FEN_COLORS[player] + ','.join(
+                ('K' if king else '') + str(square)
+                for square, king in sorted(squares[player.value])))
+        return _FEN_COLORS[self._turn] + ':' + ':'.join(fields)
+
+    @classmethod
+    def from_fen(cls, fen, n=3):
+        """
+        Creates a game in the position given in PDN FEN notation, as returned
+        by to_fen(). Ranges of squares such as "B1-12" are accepted. As in
+        PDN, black (the top player) is taken to be the starting player.
+
+        Parameters:
+            fen: str: position in FEN notation
+            n: int: the number of rows of pieces a player starts with
+            to begin the game
+
+        Returns:
+            Checkers: new game
+        """
+        fields = fen.strip().rstrip('.').split(':')
+        turn = _FEN_PLAYERS.get(fields[0].strip().upper())
+        if turn is None:
+            raise Exception('Invalid FEN: unknown player to move')
+
+        num_squares = 2 * (n + 1) * (n + 1)
+        cells = [0] * num_squares
+        for field in fields[1:]:
+            field = field.strip().upper()
+            if not field:
+                continue
+            player = _FEN_PLAYERS.get(field[0])
+            if player is None:
+                raise Exception('Invalid FEN: unknown player ' + field[0])
+            man = player.value + 1
+            for item in field[1:].split(','):
+                # most items are the plain number of a man's square
+                if item.isdigit():
+                    square = int(item) - 1
+                    if not 0 <= square < num_squares:
+                        raise Exception('Invalid FEN: square out of range '
+                                        + item)
+                    cells[square] = man
+                    continue
+
+                item = item.strip()
+                cell = man
+                if item[:1] == 'K':
+                    cell += 2
+                    item = item[1:]
+                if item.isdigit():
+                    first = last = int(item)
+                else:
+                    first, _, last = item.partition('-')
+                    if not (first.isdigit() and last.isdigit()):
+                        if not item:
+                            continue
+                        raise Exception('Invalid FEN: bad square ' + item)
+                    first, last = int(first), int(last)
+                if first < 1 or last > num_squares or first > last:
+                    raise Exception('Invalid FEN: square out of range ' + item)
+                for square in range(first - 1, last):
+                    cells[square] = cell
+
+        game = cls.__new__(cls)
+        game._n = n
+        game._zobrist = _zobrist_keys(n)
+        game._tables = _move_tables(n)
+        game._turn = turn
+        game.start_turn = Player.TOP
+        game._draw_p1 = False
+        game._draw_p2 = False
+        game._game_over = False
+        game._winner = None
+        game._last_capture_p1 = 0
+        game._last_capture_p2 = 0
+        game._multjump = []
+        game._history = []
+        game._key_history = array('Q')
+        game._key_counts = {}
+        piece_key = game._place_pieces(cells)
+        game._invalidate_moves()
+        game._key = game._compute_key(piece_key)
+        return game
+
     def __str__(self):
         """
         Returns string representation of board state, with b indicating black 
@@ -88,40 +642,12 @@ class Checkers:
         Returns: 
             None
         """
-        image = ""
-        for i in range(self._board.height()):
-            for j in range(self._board.width()):
-                piece = self._board.get((i, j))
-                if piece is None:
-                    image += "|_"
-                else:
-                    if self.start_turn == Player.BOTTOM:
-                        if piece.get_player() == Player.TOP:
-                            if piece.is_king():
-                                image += "|R"
-                            else:
-                                image += "|r"
-                        else:
-                            if piece.is_king():
-                                image += "|B"
-                            else:
-                                image += "|b"
-                    else:
-                        if piece.get_player() == Player.TOP:
-                            if piece.is_king():
-                                image += "|B"
-                            else:
-                                image += "|b"
-                        else:
-                            if piece.is_king():
-                                image += "|R"
-                            else:
-                                image += "|r"
-
-                if j == self._board.width() - 1:
-                    image += "|\n"
-
-        return image
+        if self._text is None or self._text[0] != self.start_turn:
+            text = self._image.decode()
+            if self.start_turn == Player.BOTTOM:
+                text = text.translate(_SWAP_COLORS)
+            self._text = (self.start_turn, text)
+        return self._text[1]
 
     def resign(self):
         """
@@ -135,6 +661,7 @@ class Checkers:
         """
         self._game_over = True
         self._winner = Player((self._turn.value + 1) % 2)
+        self._invalidate_moves()
 
     def draw(self):
         """
@@ -154,6 +681,7 @@ class Checkers:
 
         if self._draw_p1 and self._draw_p2:
             self._game_over = True
+        self._invalidate_moves()
 
     def get_game_state(self):
         """
@@ -210,6 +738,10 @@ class Checkers:
                 if self._last_capture_p2 >= 40:
                     self._game_over = True
 
+            # automatic draw if the same position occurs for the third time
+            if self._key_counts.get(self._key, 0) >= 2:
+                self._game_over = True
+
     def get_turn(self):
         """
         Gets the player of the current turn.
@@ -234,12 +766,31 @@ class Checkers:
         '''
         if not isinstance(player, Player):
             raise Exception('Must provide Player object')
+        if player != self._turn:
+            self._key ^= self._zobrist[1]
         self._turn = player
+        self._invalidate_moves()
+
+    def _invalidate_moves(self):
+        """
+        Forgets the cached moves of the current position. Must be called
+        whenever the board or the turn changes.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._moves = None
+        self._moves_by_pos = None
+        self._moves_by_pair = None
 
     def player_moves(self):
         """
         Returns list of moves available to the player in the corresponding turn.
-        If a jump is available, only jumps are shown.
+        If a jump is available, only jumps are shown. The list is computed once
+        per position and shared between calls, so it should not be modified.
 
         Parameters:
             player: Enum: top or bottom player
@@ -247,6 +798,20 @@ class Checkers:
         Returns: List[moves]: list with each element containing the piece and
             the destination of the piece once the move is made
         """
+        if self._moves is None:
+            self._moves = self._generate_moves()
+        return self._moves
+
+    def _generate_moves(self):
+        """
+        Generates the list of moves available to the turn player, as described
+        in player_moves.
+
+        Parameters:
+            None
+
+        Returns: List[moves]: moves available to the turn player
+        """
         if len(self._multjump) > 0:
             return self._multjump
 
@@ -281,11 +846,135 @@ class Checkers:
             tuple representing the destination of the piece once the move is 
             made, and the third element as a piece object that is jumped over
         """
-        moves = []
-        for move in self.player_moves():
-            if move[0] == pos:
-                moves.append(move)
-        return moves
+        if self._moves_by_pos is None:
+            moves_by_pos = {}
+            for move in self.player_moves():
+                if move[0] in moves_by_pos:
+                    moves_by_pos[move[0]].append(move)
+                else:
+                    moves_by_pos[move[0]] = [move]
+            self._moves_by_pos = moves_by_pos
+        return self._moves_by_pos.get(pos, [])
+
+    def _find_move(self, pos, dest):
+        """
+        Looks up the move of the turn player from a position to a destination.
+        The lookup table is built once per position from player_moves().
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of piece
+            dest: Tuple(int): tuple of row and column of destination of move
+
+        Returns: move: the matching move, or None if the move is not valid
+        """
+        if self._moves_by_pair is None:
+            self._moves_by_pair = {(move[0], move[1]): move
+                                   for move in self.player_moves()}
+        return self._moves_by_pair.get((tuple(pos), tuple(dest)))
+
+    def player_sequences(self):
+        """
+        Returns list of complete moves available to the player in the
+        corresponding turn, with every jump of a multiple-jump move combined
+        into a single move. If a jump is available, only jumps are shown. If a
+        multiple-jump move is in progress, only its remaining jumps are shown.
+
+        Parameters:
+            None
+
+        Returns: List[sequences]: list with first element as tuple of the
+            positions the piece moves through (starting with its current
+            position) and the second element as tuple of the piece objects
+            jumped over, in order (empty for non-jump moves)
+        """
+        moves = self.player_moves()
+        if len(moves) == 0 or moves[0][2] is None:
+            return [((pos, dest), ()) for pos, dest, _ in moves]
+
+        sequences = []
+        for pos in dict.fromkeys(move[0] for move in moves):
+            sequences.extend(self.jump_sequences(pos))
+        return sequences
+
+    def jump_sequences(self, pos):
+        """
+        Returns list of every complete sequence of jumps a piece can make,
+        regardless of game state. A sequence ends when the piece has no more
+        jumps or when it is kinged.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column of piece
+
+        Returns: List[sequences]: sequences in the same format as
+            player_sequences (empty if the piece cannot jump)
+        """
+        board = self._board
+        idx = pos[0] * board._width + pos[1]
+        piece = board._get(idx)
+        if piece is None:
+            return []
+
+        if piece.is_king():
+            table = self._tables[2]
+            king_row = -1
+        else:
+            table = self._tables[piece.get_player().value]
+            if piece.get_player() == Player.TOP:
+                king_row = 2 * self._n + 1
+            else:
+                king_row = 0
+
+        # the piece leaves its square and jumped pieces are removed as it
+        # goes, exactly as they are when the jumps are made one by one
+        owners = bytearray(board._owners)
+        owners[idx] = 0
+        sequences = []
+        path = [pos]
+        captured = []
+
+        def extend(idx):
+            jumps = self._ghost_piece_jumps(idx, table, piece, owners)
+            if len(jumps) == 0:
+                if len(captured) > 0:
+                    sequences.append((tuple(path), tuple(captured)))
+                return
+            for step, land, land_pos in jumps:
+                owner = owners[step]
+                owners[step] = 0
+                path.append(land_pos)
+                captured.append(board._get(step))
+                if land_pos[0] == king_row:
+                    # kinging ends the move
+                    sequences.append((tuple(path), tuple(captured)))
+                else:
+                    extend(land)
+                path.pop()
+                captured.pop()
+                owners[step] = owner
+
+        extend(idx)
+        return sequences
+
+    def _ghost_piece_jumps(self, idx, table, piece, owners):
+        """
+        Returns the single jumps available to a piece as if it stood on a
+        given square of a board with the given owners, without moving it.
+
+        Parameters:
+            idx: int: square index the piece is considered to stand on
+            table: Tuple: move table of the piece (see _move_tables)
+            piece: Piece: the jumping piece
+            owners: bytearray: owner of every square (see Board)
+
+        Returns: List[Tuple]: square index of the jumped piece, square index
+            of the landing square and position of the landing square
+        """
+        opponent = 2 - piece.get_player().value
+        jumps = []
+        for step, _, land, land_pos in table[idx]:
+            if land >= 0 and owners[step] == opponent and owners[land] == 0:
+                jumps.append((step, land, land_pos))
+        return jumps
 
     def _all_piece_moves(self, pos):
         """
@@ -301,115 +990,28 @@ class Checkers:
             tuple representing the destination of the piece once the move is 
             made, and the third element as a piece object that is jumped over
         """
-        i, j = pos
-        piece = self._board.get((i, j))
-        moves = []
+        board = self._board
+        owners = board._owners
+        idx = pos[0] * board._width + pos[1]
+        piece = board._get(idx)
         if piece is None:
             return []
 
         if piece.is_king():
-            if i > 0:
-                # NW
-                if j > 0:
-                    if self._board.get((i - 1, j - 1)) is None:
-                        # regular move
-                        moves.append((pos, (i - 1, j - 1), None))
-                    else:
-                        # check for possible jump move
-                        if (i > 1 and j > 1 and
-                            self._board.get((i - 1, j - 1)).get_player()
-                            != piece.get_player()
-                                and self._board.get((i - 2, j - 2)) is None):
-                            # store jumped over piece in moves
-                            moves.append((pos, (i - 2, j - 2),
-                                          self._board.get((i - 1, j - 1))))
-
-                # NE
-                if j < 2 * self._n + 1:
-                    if self._board.get((i - 1, j + 1)) is None:
-                        moves.append((pos, (i - 1, j + 1), None))
-                    else:
-                        if (i > 1 and j < 2 * self._n and
-                            self._board.get((i - 1, j + 1)).get_player()
-                            != piece.get_player()
-                                and self._board.get((i - 2, j + 2)) is None):
-                            moves.append((pos, (i - 2, j + 2),
-                                          self._board.get((i - 1, j + 1))))
-
-            if i < 2 * self._n + 1:
-                # SW
-                if j > 0:
-                    if self._board.get((i + 1, j - 1)) is None:
-                        moves.append((pos, (i + 1, j - 1), None))
-                    else:
-                        if (i < 2 * self._n and j > 1 and
-                            self._board.get((i + 1, j - 1)).get_player()
-                            != piece.get_player()
-                                and self._board.get((i + 2, j - 2)) is None):
-                            moves.append((pos, (i + 2, j - 2),
-                                          self._board.get((i + 1, j - 1))))
-                # SE
-                if j < 2 * self._n + 1:
-                    if self._board.get((i + 1, j + 1)) is None:
-                        moves.append((pos, (i + 1, j + 1), None))
-                    else:
-                        if (i < 2 * self._n and j < 2 * self._n and
-                            self._board.get((i + 1, j + 1)).get_player()
-                            != piece.get_player()
-                                and self._board.get((i + 2, j + 2)) is None):
-                            moves.append((pos, (i + 2, j + 2),
-                                          self._board.get((i + 1, j + 1))))
+            table = self._tables[2]
         else:
             # only look in direction of player
-            if piece.get_player() == Player.TOP:
-                if i < 2 * self._n + 1:
-                    # SW
-                    if j > 0:
-                        if self._board.get((i + 1, j - 1)) is None:
-                            moves.append((pos, (i + 1, j - 1), None))
-                        else:
-                            if (i < 2 * self._n and j > 1 and
-                                (self._board.get((i + 1, j - 1)).get_player()
-                                 != piece.get_player())
-                                    and self._board.get((i + 2, j - 2)) is None):
-                                moves.append((pos, (i + 2, j - 2),
-                                              self._board.get((i + 1, j - 1))))
-                    # SE
-                    if j < 2 * self._n + 1:
-                        if self._board.get((i + 1, j + 1)) is None:
-                            moves.append((pos, (i + 1, j + 1), None))
-                        else:
-                            if (i < 2 * self._n and j < 2 * self._n and
-                                (self._board.get((i + 1, j + 1)).get_player()
-                                 != piece.get_player())
-                                    and self._board.get((i + 2, j + 2)) is None):
-                                moves.append((pos, (i + 2, j + 2),
-                                              self._board.get((i + 1, j + 1))))
-            else:
-                if i > 0:
-                    # NW
-                    if j > 0:
-                        if self._board.get((i - 1, j - 1)) is None:
-                            moves.append((pos, (i - 1, j - 1), None))
-                        else:
-                            if (i > 1 and j > 1 and
-                                (self._board.get((i - 1, j - 1)).get_player()
-                                 != piece.get_player())
-                                    and self._board.get((i - 2, j - 2)) is None):
-                                moves.append((pos, (i - 2, j - 2),
-                                              self._board.get((i - 1, j - 1))))
-
-                    # NE
-                    if j < 2 * self._n + 1:
-                        if self._board.get((i - 1, j + 1)) is None:
-                            moves.append((pos, (i - 1, j + 1), None))
-                        else:
-                            if (i > 1 and j < 2 * self._n and
-                                (self._board.get((i - 1, j + 1)).get_player()
-                                 != piece.get_player())
-                                    and self._board.get((i - 2, j + 2)) is None):
-                                moves.append((pos, (i - 2, j + 2),
-                                              self._board.get((i - 1, j + 1))))
+            table = self._tables[piece.get_player().value]
+
+        moves = []
+        owner = owners[idx]
+        for step, step_pos, land, land_pos in table[idx]:
+            if owners[step] == 0:
+                # regular move
+                moves.append((pos, step_pos, None))
+            elif land >= 0 and owners[step] != owner and owners[land] == 0:
+                # store jumped over piece in moves
+                moves.append((pos, land_pos, board._get(step)))
 
         return moves
 
@@ -426,15 +1028,7 @@ class Checkers:
         Returns:
             Boolean: whether or not the move is valid
         """
-        piece = self._board.get(pos)
-        if piece is None or self._turn != piece.get_player():
-            return False
-
-        for move in self.player_moves():
-            if move[0] == pos and move[1] == dest:
-                return True
-
-        return False
+        return self._find_move(pos, dest) is not None
 
     def move(self, pos, dest):
         """
@@ -451,75 +1045,286 @@ class Checkers:
         if self._game_over:
             return
 
-        piece = self._board.get((pos[0], pos[1]))
-        if piece is not None and piece.get_player() == self._turn:
-            # check if it is a valid move
-            # print(pos[0], pos[1])
-            found_move = None
-            for move in self.player_moves():
-                if move[0] == pos and move[1] == dest:
-                    found_move = move
-                    break
-
-            if found_move is not None:
-                # kings a piece if end of board reached by non-king piece
-                kinged = False
-                if not piece.is_king():
-                    if self._turn == Player.TOP and dest[0] == 2 * self._n + 1:
-                        piece.set_king()
-                        kinged = True
-
-                    if self._turn == Player.BOTTOM and dest[0] == 0:
-                        piece.set_king()
-                        kinged = True
-
-                # coordinate removing of jumped pieces
-                if found_move[2] is not None:
-                    self._board.move(pos, dest)
-                    piece.set_pos(dest[0], dest[1])
-
-                    # remove jumped over piece
-                    self._board.remove(move[2].get_pos())
-                    if self._turn == Player.TOP:
-                        self._p2.remove(move[2])
-                    else:
-                        self._p1.remove(move[2])
-
-                    # change turns or continuing jumping
-                    consecutive_jumps = []
-                    for move in self._all_piece_moves(dest):
-                        if move[2] is not None:
-                            # can jump again!
-                            consecutive_jumps.append(move)
-
-                    # kinging ends turn (must also reset multjumps)
-                    if len(consecutive_jumps) > 0 and not kinged:
-                        self._multjump = consecutive_jumps
-                    else:
-                        self._multjump = []
-
-                        if self._turn == Player.TOP:
-                            self._last_capture_p1 = 0
-                            self._draw_p2 = False
-                        else:
-                            self._last_capture_p2 = 0
-                            self._draw_p1 = False
-                        self._turn = Player((self._turn.value + 1) % 2)
-                        self._check_winner()
+        # only moves of the turn player are in the lookup table
+        found_move = self._find_move(pos, dest)
+        if found_move is not None:
+            self._play_move(found_move)
+
+    def _play_move(self, move):
+        """
+        Makes a move of the game, recording it in the history. Every move
+        played through move() or move_sequence() goes through here, while
+        moves searched with apply_move() are not recorded.
 
+        Parameters:
+            move: Tuple: move as returned by player_moves()
+
+        Returns:
+            None
+        """
+        self._history.append((self._turn, move[0], move[1]))
+        self._make_move(move)
+
+    def get_history(self):
+        """
+        Returns the moves made with move() or move_sequence() since the start
+        of the game, one entry per single step or jump, so a multiple jump
+        takes several entries.
+
+        Parameters:
+            None
+
+        Returns: List[Tuple]: tuples of the player that moved, the position
+            of the piece and its destination
+        """
+        return self._history
+
+    def apply_move(self, move):
+        """
+        Makes a move taken from player_moves() without validating it, and
+        returns a record of everything the move changed so that undo_move()
+        can take it back. Meant for searching ahead without copying the game.
+
+        Parameters:
+            move: Tuple: move as returned by player_moves()
+
+        Returns:
+            Tuple: undo record to pass to undo_move()
+        """
+        multjump = self._multjump
+        turn = self._turn
+        draw_p1 = self._draw_p1
+        draw_p2 = self._draw_p2
+        last_capture_p1 = self._last_capture_p1
+        last_capture_p2 = self._last_capture_p2
+        game_over = self._game_over
+        winner = self._winner
+        key = self._key
+        kinged = self._make_move(move)
+        return (move, kinged, multjump, turn, draw_p1, draw_p2,
+                last_capture_p1, last_capture_p2, game_over, winner, key)
+
+    def undo_move(self, record):
+        """
+        Restores the game to the exact state it was in before the move that
+        produced the undo record. Records must be undone in the reverse order
+        they were made in.
+
+        Parameters:
+            record: Tuple: undo record returned by apply_move()
+
+        Returns:
+            None
+        """
+        ((pos, dest, jumped), kinged, self._multjump, self._turn,
+         self._draw_p1, self._draw_p2, self._last_capture_p1,
+         self._last_capture_p2, self._game_over, self._winner,
+         self._key) = record
+        self._invalidate_moves()
+
+        key = self._key_history.pop()
+        if self._key_counts[key] == 1:
+            del self._key_counts[key]
+        else:
+            self._key_counts[key] -= 1
+
+        piece = self._board.get(dest)
+        self._board.move(dest, pos)
+        piece.set_pos(pos[0], pos[1])
+        mover = piece.get_player().value
+        if kinged:
+            piece.unset_king()
+            self._men[mover] += 1
+            self._kings[mover] -= 1
+            self._advancement[mover] += self._advance(mover, pos[0])
+        elif not piece.is_king():
+            self._advancement[mover] -= (self._advance(mover, dest[0])
+                                         - self._advance(mover, pos[0]))
+        self._render_square(dest, None)
+        self._render_square(pos, piece)
+
+        # put back jumped over piece
+        if jumped is not None:
+            self._board.add_piece(jumped.get_pos(), jumped)
+            self._render_square(jumped.get_pos(), jumped)
+            jumped_side = jumped.get_player().value
+            if jumped.is_king():
+                self._kings[jumped_side] += 1
+            else:
+                self._men[jumped_side] += 1
+                self._advancement[jumped_side] += self._advance(
+                    jumped_side, jumped.get_pos()[0])
+            if jumped.get_player() == Player.TOP:
+                self._p1.add(jumped)
+            else:
+                self._p2.add(jumped)
+
+    def move_sequence(self, path):
+        """
+        Makes a complete move for the player in the current turn, jumping
+        through every position in the path in a single call.
+
+        Parameters:
+            path: Tuple(Tuple(int)): positions the piece moves through,
+                starting with its current position
+
+        Returns:
+            None
+        """
+        if self._game_over:
+            return
+
+        path = tuple(path)
+        for hops, captured in self.player_sequences():
+            if hops == path:
+                for k in range(len(hops) - 1):
+                    jumped = captured[k] if len(captured) > 0 else None
+                    self._play_move((hops[k], hops[k + 1], jumped))
+                return
+
+    def apply_sequence(self, sequence):
+        """
+        Makes a complete move taken from player_sequences() without validating
+        it, and returns the records that undo_sequence() can use to take it
+        back.
+
+        Parameters:
+            sequence: Tuple: move as returned by player_sequences()
+
+        Returns:
+            List[Tuple]: undo records to pass to undo_sequence()
+        """
+        path, captured = sequence
+        records = []
+        for k in range(len(path) - 1):
+            jumped = captured[k] if len(captured) > 0 else None
+            records.append(self.apply_move((path[k], path[k + 1], jumped)))
+        return records
+
+    def undo_sequence(self, records):
+        """
+        Restores the game to the exact state it was in before the complete
+        move that produced the undo records.
+
+        Parameters:
+            records: List[Tuple]: undo records returned by apply_sequence()
+
+        Returns:
+            None
+        """
+        for record in reversed(records):
+            self.undo_move(record)
+
+    def _make_move(self, move):
+        """
+        Updates the board and the game state for a move of the turn player,
+        only to be used by internal logic once the move is known to be valid.
+
+        Parameters:
+            move: Tuple: move as returned by player_moves()
+
+        Returns:
+            Boolean: whether the moved piece was kinged
+        """
+        pos, dest, jumped = move
+        piece = self._board.get(pos)
+        self._invalidate_moves()
+
+        # remember the position the move is made from
+        key = self._key
+        self._key_history.append(key)
+        self._key_counts[key] = self._key_counts.get(key, 0) + 1
+
+        pieces, side, jumps = self._zobrist
+        player_keys = pieces[self._turn.value]
+        key = self._key ^ player_keys[piece.is_king()][pos[0]][pos[1]]
+        if len(self._multjump) > 0:
+            key ^= jumps[pos[0]][pos[1]]
+
+        # kings a piece if end of board reached by non-king piece
+        kinged = False
+        if not piece.is_king():
+            if self._turn == Player.TOP and dest[0] == 2 * self._n + 1:
+                piece.set_king()
+                kinged = True
+
+            if self._turn == Player.BOTTOM and dest[0] == 0:
+                piece.set_king()
+                kinged = True
+        key ^= player_keys[piece.is_king()][dest[0]][dest[1]]
+
+        mover = self._turn.value
+        if kinged:
+            self._men[mover] -= 1
+            self._kings[mover] += 1
+            self._advancement[mover] -= self._advance(mover, pos[0])
+        elif not piece.is_king():
+            self._advancement[mover] += (self._advance(mover, dest[0])
+                                         - self._advance(mover, pos[0]))
+        self._render_square(pos, None)
+        self._render_square(dest, piece)
+
+        # coordinate removing of jumped pieces
+        if jumped is not None:
+            self._board.move(pos, dest)
+            piece.set_pos(dest[0], dest[1])
+
+            # remove jumped over piece
+            self._board.remove(jumped.get_pos())
+            self._render_square(jumped.get_pos(), None)
+            i, j = jumped.get_pos()
+            key ^= pieces[jumped.get_player().value][jumped.is_king()][i][j]
+            jumped_side = jumped.get_player().value
+            if jumped.is_king():
+                self._kings[jumped_side] -= 1
+            else:
+                self._men[jumped_side] -= 1
+                self._advancement[jumped_side] -= self._advance(jumped_side, i)
+            if self._turn == Player.TOP:
+                self._p2.remove(jumped)
+            else:
+                self._p1.remove(jumped)
+
+            # change turns or continuing jumping
+            consecutive_jumps = []
+            for move in self._all_piece_moves(dest):
+                if move[2] is not None:
+                    # can jump again!
+                    consecutive_jumps.append(move)
+
+            # kinging ends turn (must also reset multjumps)
+            if len(consecutive_jumps) > 0 and not kinged:
+                self._multjump = consecutive_jumps
+                self._key = key ^ jumps[dest[0]][dest[1]]
+            else:
+                self._multjump = []
+                self._key = key ^ side
+
+                if self._turn == Player.TOP:
+                    self._last_capture_p1 = 0
+                    self._draw_p2 = False
                 else:
-                    self._board.move(pos, dest)
-                    piece.set_pos(dest[0], dest[1])
-
-                    # change turns and evaluate game state!
-                    if self._turn == Player.TOP:
-                        self._last_capture_p1 += 1
-                        self._draw_p2 = False
-                    else:
-                        self._last_capture_p2 += 1
-                        self._draw_p1 = False
-                    self._turn = Player((self._turn.value + 1) % 2)
-                    self._check_winner()
+                    self._last_capture_p2 = 0
+                    self._draw_p1 = False
+                self._turn = Player((self._turn.value + 1) % 2)
+                self._check_winner()
+
+        else:
+            self._board.move(pos, dest)
+            piece.set_pos(dest[0], dest[1])
+            self._key = key ^ side
+
+            # change turns and evaluate game state!
+            if self._turn == Player.TOP:
+                self._last_capture_p1 += 1
+                self._draw_p2 = False
+            else:
+                self._last_capture_p2 += 1
+                self._draw_p1 = False
+            self._turn = Player((self._turn.value + 1) % 2)
+            self._check_winner()
+
+        return kinged
 
     def to_piece_grid(self):
         """
@@ -532,41 +1337,18 @@ class Checkers:
         Returns:
             List[List]: list of lists
         """
-        grid_list = [[] for _ in range(self._board.height())]
-        for i in range(self._board.height()):
-            for j in range(self._board.width()):
-                piece = self._board.get((i, j))
-                if piece is None:
-                    grid_list[i] += ' '
-                else:
-                    if self.start_turn == Player.BOTTOM:
-                        if piece.get_player() == Player.TOP:
-                            if piece.is_king():
-                                grid_list[i] += 'R'
-                            else:
-                                grid_list[i] += "r"
-                        else:
-                            if piece.is_king():
-                                grid_list[i] += "B"
-                            else:
-                                grid_list[i] += "b"
-                    else:
-                        if piece.get_player() == Player.TOP:
-                            if piece.is_king():
-                                grid_list[i] += "B"
-                            else:
-                                grid_list[i] += "b"
-                        else:
-                            if piece.is_king():
-                                grid_list[i] += 'R'
-                            else:
-                                grid_list[i] += "r"
-        return grid_list
+        return [list(row[1::2].replace('_', ' '))
+                for row in str(self).splitlines()]
 
 
 class Board:
     """
     Class for representing a generic n by n game board, with height and width n
+
+    Cells are stored row by row in a single flat list, with square
+    row * width + col holding the piece at (row, col). A bytearray of the same
+    layout records who owns each square (0 empty, 1 top player, 2 bottom
+    player) so that game logic can test squares without touching pieces.
     """
 
     def __init__(self, n, m):
@@ -579,7 +1361,8 @@ class Board:
         """
         self._height = n
         self._width = m
-        self._cells = [[None for _ in range(m)] for _ in range(n)]
+        self._cells = [None] * (n * m)
+        self._owners = bytearray(n * m)
 
     def height(self):
         """
@@ -605,6 +1388,31 @@ class Board:
         """
         return self._width
 
+    def _in_bounds(self, pos):
+        """
+        Checks whether a position is on the board.
+
+        Parameters:
+            pos: Tuple(int): tuple of row and column
+
+        Returns:
+            Boolean
+        """
+        return 0 <= pos[0] < self._height and 0 <= pos[1] < self._width
+
+    def _get(self, idx):
+        """
+        Retrieve object at a square index without any bounds checking, only to
+        be used by internal logic.
+
+        Parameters:
+            idx: int: square index (row * width + col)
+
+        Returns:
+            Object: element on the board
+        """
+        return self._cells[idx]
+
     def move(self, pos, dest):
         """
         Moves object in specified cell to a destination cell.
@@ -616,10 +1424,13 @@ class Board:
         Returns:
             None
         """
-        if (0 <= pos[0] < self._height and 0 <= pos[1] < self._width and
-                0 <= dest[0] < self._height and 0 <= dest[1] < self._width):
-            self._cells[dest[0]][dest[1]] = self._cells[pos[0]][pos[1]]
-            self._cells[pos[0]][pos[1]] = None
+        if self._in_bounds(pos) and self._in_bounds(dest):
+            src = pos[0] * self._width + pos[1]
+            dst = dest[0] * self._width + dest[1]
+            self._cells[dst] = self._cells[src]
+            self._owners[dst] = self._owners[src]
+            self._cells[src] = None
+            self._owners[src] = 0
         else:
             raise Exception('Index out of bounds')
 
@@ -633,8 +1444,9 @@ class Board:
         Returns:
             None
         """
-        if 0 <= pos[0] < self._height and 0 <= pos[1] < self._width:
-            self._cells[pos[0]][pos[1]] = None
+        if self._in_bounds(pos):
+            self._cells[pos[0] * self._width + pos[1]] = None
+            self._owners[pos[0] * self._width + pos[1]] = 0
         else:
             raise Exception('Index out of bounds')
 
@@ -651,8 +1463,8 @@ class Board:
         # check if positions are within boundaries
         if pos[0] == None or pos[1] == None:
             return None
-        elif 0 <= pos[0] < self._height and 0 <= pos[1] < self._width:
-            return self._cells[pos[0]][pos[1]]
+        elif self._in_bounds(pos):
+            return self._cells[pos[0] * self._width + pos[1]]
         else:
             raise Exception('Index out of bounds')
 
@@ -668,8 +1480,13 @@ class Board:
         Returns:
             None
         """
-        if 0 <= pos[0] < self._height and 0 <= pos[1] < self._width:
-            self._cells[pos[0]][pos[1]] = piece
+        if self._in_bounds(pos):
+            idx = pos[0] * self._width + pos[1]
+            self._cells[idx] = piece
+            if piece is None:
+                self._owners[idx] = 0
+            else:
+                self._owners[idx] = piece.get_player().value + 1
         else:
             raise Exception('Index out of bounds')
 
@@ -684,15 +1501,14 @@ class Board:
             String
         """
         image = ""
-        for i, row in enumerate(self.cells):
-            for j, cell in enumerate(row):
-                if cell is None:
-                    image += " X "
-                else:
-                    image += " O "
+        for idx, owner in enumerate(self._owners):
+            if owner == 0:
+                image += " X "
+            else:
+                image += " O "
 
-                if j == len(row) - 1:
-                    image += "\n"
+            if idx % self._width == self._width - 1:
+                image += "\n"
 
         return image
 
@@ -701,6 +1517,7 @@ class Piece:
     """
     Class for representing a checkers piece
     """
+    __slots__ = ('_is_king', '_row', '_col', '_player')
 
     def __init__(self, row, col, player):
         """
@@ -766,6 +1583,18 @@ class Piece:
         """
         self._is_king = True
 
+    def unset_king(self):
+        """
+        Turns a king back into a normal piece (used when undoing a move).
+
+        Parameters:
+            None
+
+        Returns: 
+            None
+        """
+        self._is_king = False
+
     def get_player(self):
         """
         Returns player of the piece.
@@ -777,3 +1606,149 @@ class Piece:
             Player: owner of the piece
         """
         return self._player
+
+
+class GameState:
+    """
+    Class for representing an immutable snapshot of a game of Checkers, packed
+    into a single bytes object: a small header with the board size, turn,
+    draw and game over flags, winner, moves since the last capture and the
+    piece continuing a multi-jump, followed by half a byte per dark square
+    (0 empty, 1 top piece, 2 bottom piece, 3 top king, 4 bottom king).
+    Snapshots can be compared, hashed and pickled.
+    """
+    __slots__ = ('_data', '_hash')
+
+    # n, flags, moves since last capture of each player, multi-jump square
+    _HEADER = struct.Struct('<BBHHh')
+
+    def __init__(self, data):
+        """
+        Constructor
+
+        Parameters:
+            data: bytes: packed state, as returned by to_bytes()
+        """
+        object.__setattr__(self, '_data', bytes(data))
+        object.__setattr__(self, '_hash', hash(self._data))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('GameState is immutable')
+
+    def __reduce__(self):
+        return (GameState, (self._data,))
+
+    def __eq__(self, other):
+        return isinstance(other, GameState) and self._data == other._data
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return 'GameState({!r})'.format(self._data)
+
+    @classmethod
+    def pack(cls, n, header, cells):
+        """
+        Creates a snapshot from the state of a game, as kept by any engine.
+
+        Parameters:
+            n: int: the number of rows of pieces a player starts with
+            header: Tuple: the state of the game apart from its pieces, as
+                returned by header()
+            cells: List[int]: contents of every dark square, numbered row by
+                row from 0, as described in the class docstring
+
+        Returns:
+            GameState: snapshot of the game
+        """
+        (turn, start_turn, draw_p1, draw_p2, game_over, winner,
+         last_capture_p1, last_capture_p2, jumping) = header
+        flags = turn.value | start_turn.value << 1
+        if draw_p1:
+            flags |= 4
+        if draw_p2:
+            flags |= 8
+        if game_over:
+            flags |= 16
+        if winner is not None:
+            flags |= (winner.value + 1) << 5
+        jumping = dark_index(jumping, n) if jumping is not None else -1
+
+        data = cls._HEADER.pack(n, flags, last_capture_p1, last_capture_p2,
+                                jumping)
+        return cls(data + bytes(low | high << 4 for low, high
+                                in zip(cells[0::2], cells[1::2])))
+
+    @classmethod
+    def packed_size(cls, n):
+        """
+        Returns the length of the packed snapshots of games of a size.
+
+        Parameters:
+            n: int: the number of rows of pieces a player starts with
+
+        Returns:
+            int: number of bytes
+        """
+        return cls._HEADER.size + (n + 1) * (n + 1)
+
+    def header(self):
+        """
+        Returns the state of the game apart from its pieces.
+
+        Parameters:
+            None
+
+        Returns:
+            Tuple: the turn, the starting player, the draw requests of the
+                top and bottom players, whether the game is over, the winner
+                (None if none), the moves since the last capture of the top
+                and bottom players, and the position of the piece continuing
+                a multi-jump (None if none)
+        """
+        n, flags, last_capture_p1, last_capture_p2, jumping = \
+            self._HEADER.unpack_from(self._data)
+        winner = Player((flags >> 5) - 1) if flags >> 5 else None
+        jumping = dark_position(jumping, n) if jumping >= 0 else None
+        return (Player(flags & 1), Player(flags >> 1 & 1), bool(flags & 4),
+                bool(flags & 8), bool(flags & 16), winner, last_capture_p1,
+                last_capture_p2, jumping)
+
+    def cells(self):
+        """
+        Returns the contents of the dark squares.
+
+        Parameters:
+            None
+
+        Returns:
+            List[int]: contents of every dark square, numbered row by row
+                from 0, as described in the class docstring
+        """
+        return [cell for byte in self._data[self._HEADER.size:]
+                for cell in (byte & 15, byte >> 4)]
+
+    def get_n(self):
+        """
+        Returns the size of the game the snapshot was taken from.
+
+        Parameters:
+            None
+
+        Returns:
+            int: the number of rows of pieces a player starts with
+        """
+        return self._data[0]
+
+    def to_bytes(self):
+        """
+        Returns the packed state.
+
+        Parameters:
+            None
+
+        Returns:
+            bytes: packed state
+        """
+        return self._data
@@ -7,6 +7,7 @@ import time
 from checkers import Checkers, Player
 from mocks import CheckersStub, CheckersMock
 from bot import RandomBot, SmartBot
+from pdn import PDNWriter
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
@@ -44,7 +45,8 @@ class GUIPlayer:
     or a bot.
     """
 
-    def __init__(self, n: int, player_type: str, board: Checkers, player: Player, opponent: Player):
+    def __init__(self, n: int, player_type: str, board: Checkers, player: Player, opponent: Player,
+                 think_ms: float = None):
         """
         Constructor
         Parameters:
@@ -53,6 +55,8 @@ class GUIPlayer:
         board: The Checkers board of m size
         player: Whether player is top or bottom
         opponent: Whether opponent is top or bottom
+        think_ms: Time budget per move of a smart bot in milliseconds, None
+           to search to a fixed depth
         """
         self.board = board
         self.player = player
@@ -65,7 +69,7 @@ class GUIPlayer:
             self.bot = RandomBot(board, player, opponent)
         if player_type == "smart-bot":
             self.name = f"Smart Bot {n}"
-            self.bot = SmartBot(board, player, opponent)
+            self.bot = SmartBot(board, player, opponent, think_ms=think_ms)
 
 
 def calculate_pos(n, y: int, x: int):
@@ -265,7 +269,7 @@ def winner_screen(surface: pygame.surface.Surface, winner: str) -> None:
 
 
 def play_checkers(board: Checkers, players: dict, bot_delay: float,
-                  board_size: int) -> None:
+                  board_size: int, pdn: PDNWriter = None) -> None:
     """
     Playes the checkers
 
@@ -275,6 +279,7 @@ def play_checkers(board: Checkers, players: dict, bot_delay: float,
     bot_delay: When playing as a bot, an artificial delay
            (in seconds) to wait before making a move.
     board_size: Board size to make the board.
+    pdn: Writer to log the finished game to, if not None
 
     Returns: None
     """
@@ -373,6 +378,10 @@ def play_checkers(board: Checkers, players: dict, bot_delay: float,
         clock.tick(120)
 
     draw_board(surface, board, mouse)
+    if pdn is not None:
+        pdn.write_game(board, {"Event": "checkers-gui",
+                               "Black": players[Player.TOP].name,
+                               "White": players[Player.BOTTOM].name})
     if board._winner is None:
         player = "Nobody"
     winner_screen(surface, player)
@@ -393,16 +402,24 @@ def play_checkers(board: Checkers, players: dict, bot_delay: float,
                                  case_sensitive=False),
                default="human")
 @ click.option('--bot-delay', type=click.FLOAT, default=0)
-def cmd(player1, player2, bot_delay, board_size):
+@ click.option('--pdn', type=click.Path(dir_okay=False), default=None,
+               help="PDN file to append the finished game to")
+@ click.option('--think-ms', type=click.FLOAT, default=None,
+               help="time budget per move of smart bots in milliseconds")
+def cmd(player1, player2, bot_delay, board_size, pdn, think_ms):
     board = Checkers(board_size)
     player1 = GUIPlayer(1, player1, board, Player.TOP,
-                        Player.BOTTOM)
+                        Player.BOTTOM, think_ms)
     player2 = GUIPlayer(2, player2, board, Player.BOTTOM,
-                        Player.TOP)
+                        Player.TOP, think_ms)
 
     players = {Player.TOP: player1, Player.BOTTOM: player2}
 
-    play_checkers(board, players, bot_delay, board_size)
+    if pdn is not None:
+        with PDNWriter(pdn) as writer:
+            play_checkers(board, players, bot_delay, board_size, writer)
+    else:
+        play_checkers(board, players, bot_delay, board_size)
 
 
 if __name__ == "__main__":
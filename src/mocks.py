@@ -46,18 +46,30 @@ class CheckersStub:
     def move(self, pos, dest) -> None:
         pass
 
+    def get_history(self) -> list:
+        return []
+
+    def repetition_count(self) -> int:
+        return 1
+
     def to_piece_grid(self) -> list:
         return []
 
     def is_bottled(selff, piece) -> bool:
         return True
 
-    def _ghost_piece_jumps(self, pos, piece) -> list:
+    def player_sequences(self) -> list:
         return []
 
-    def jump_sequences(self, pos, piece) -> list:
+    def _ghost_piece_jumps(self, idx, table, piece, owners) -> list:
         return []
 
+    def jump_sequences(self, pos) -> list:
+        return []
+
+    def move_sequence(self, path) -> None:
+        pass
+
     def _has_last_move(self, player) -> bool:
         return False
 
@@ -0,0 +1,290 @@
+"""
+Game records in Portable Draughts Notation (PDN)
+
+PDNWriter appends finished games to a PDN file, and read_games() streams the
+games of a PDN file back one at a time, so neither keeps more than one game
+in memory whatever the size of the file.
+
+Squares are numbered as in Checkers.to_fen(): dark squares from 1, row by row
+starting at the top left. Black is the top player (player 1) and White the
+bottom player (player 2). Since either player may start a game, every record
+carries a FEN tag with the starting position and the player to move, and a
+BoardSize tag with the number of rows of pieces of each player. The result
+is "1-0" when Black wins, "0-1" when White wins, "1/2-1/2" for a draw and
+"*" for a game that did not finish.
+
+Examples:
+    1) Logging games
+        with PDNWriter("games.pdn") as writer:
+            writer.write_game(game, {"Black": "random", "White": "smart"})
+
+    2) Replaying every game of a file
+        for record in read_games("games.pdn"):
+            game = record.to_checkers()
+"""
+from checkers import Checkers, Player, dark_index, dark_position
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+# longest line of move text written
+_LINE_LENGTH = 79
+
+
+def start_fen(n, turn):
+    """
+    Returns the FEN of the starting position of a game.
+
+    Parameters:
+        n: int: the number of rows of pieces a player starts with
+        turn: Player: player to move first
+
+    Returns: str: starting position in FEN notation
+    """
+    squares = 2 * (n + 1) * (n + 1)
+    pieces = n * (n + 1)
+    return "{}:W{}-{}:B1-{}".format("B" if turn == Player.TOP else "W",
+                                    squares - pieces + 1, squares, pieces)
+
+
+def game_result(game):
+    """
+    Returns the PDN result of a game.
+
+    Parameters:
+        game: Checkers or BitboardCheckers: the game
+
+    Returns: str: one of "1-0", "0-1", "1/2-1/2" or "*"
+    """
+    if not game._game_over:
+        return "*"
+    if game._winner == Player.TOP:
+        return "1-0"
+    if game._winner == Player.BOTTOM:
+        return "0-1"
+    return "1/2-1/2"
+
+
+def format_moves(history, n):
+    """
+    Groups the steps and jumps of a game history into PDN moves. The jumps
+    of a multiple jump form a single move, such as "9x18x27".
+
+    Parameters:
+        history: List[Tuple]: history as returned by get_history()
+        n: int: the number of rows of pieces a player starts with
+
+    Returns: List[Tuple]: tuples of the player that moved and the PDN move
+    """
+    moves = []
+    last = None
+    for player, pos, dest in history:
+        square = dark_index(pos, n) + 1
+        dest_square = dark_index(dest, n) + 1
+        jump = abs(dest[0] - pos[0]) == 2
+        if (jump and last is not None and last[0] == player
+                and last[1] == pos and last[2]):
+            moves[-1] = (player, "{}x{}".format(moves[-1][1], dest_square))
+        else:
+            sep = "x" if jump else "-"
+            moves.append((player, "{}{}{}".format(square, sep, dest_square)))
+        last = (player, dest, jump)
+    return moves
+
+
+class PDNWriter:
+    """
+    Class for appending game records to a PDN file
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Parameters:
+            path: str: file to append games to, created if missing
+        """
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Closes the file.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._file.close()
+
+    def write_game(self, game, tags=None, fen=None):
+        """
+        Appends the record of a game played with move() to the file.
+
+        Parameters:
+            game: Checkers or BitboardCheckers: the game
+            tags: dict: extra tags, such as Event, Black and White
+            fen: str: starting position, the start of a new game with
+                game.start_turn to move if None
+
+        Returns:
+            None
+        """
+        n = game._n
+        if fen is None:
+            fen = start_fen(n, game.start_turn)
+        result = game_result(game)
+
+        lines = []
+        for name, value in (tags or {}).items():
+            lines.append('[{} "{}"]'.format(name, value))
+        lines.append('[Result "{}"]'.format(result))
+        lines.append('[BoardSize "{}"]'.format(n))
+        lines.append('[FEN "{}"]'.format(fen))
+        lines.append("")
+
+        tokens = []
+        number = 1
+        black_moved = False
+        for player, move in format_moves(game.get_history(), n):
+            if player == Player.TOP:
+                tokens.append("{}. {}".format(number, move))
+                black_moved = True
+            else:
+                if not black_moved:
+                    move = "{}... {}".format(number, move)
+                tokens.append(move)
+                number += 1
+                black_moved = False
+        tokens.append(result)
+
+        line = ""
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > _LINE_LENGTH:
+                lines.append(line)
+                line = token
+            else:
+                line = line + " " + token if line else token
+        lines.append(line)
+        lines.append("")
+        self._file.write("\n".join(lines) + "\n")
+
+
+class PDNGame:
+    """
+    Class for representing a game record read from a PDN file
+    """
+
+    def __init__(self, tags, moves, result):
+        """
+        Constructor
+
+        Parameters:
+            tags: dict: tags of the game
+            moves: List[str]: PDN moves, such as "11-15" or "9x18x27"
+            result: str: one of "1-0", "0-1", "1/2-1/2" or "*"
+        """
+        self.tags = tags
+        self.moves = moves
+        self.result = result
+
+    def get_n(self):
+        """
+        Returns the size of the game, from its BoardSize tag.
+
+        Parameters:
+            None
+
+        Returns:
+            int: the number of rows of pieces a player starts with
+        """
+        return int(self.tags.get("BoardSize", 3))
+
+    def get_hops(self):
+        """
+        Returns the single steps and jumps of the game, in order.
+
+        Parameters:
+            None
+
+        Returns: List[Tuple]: tuples of the position of the piece and its
+            destination
+        """
+        n = self.get_n()
+        hops = []
+        for move in self.moves:
+            squares = [int(square) - 1
+                       for square in move.replace("x", "-").split("-")]
+            positions = [dark_position(k, n) for k in squares]
+            hops.extend(zip(positions, positions[1:]))
+        return hops
+
+    def to_checkers(self):
+        """
+        Replays the game from its starting position.
+
+        Parameters:
+            None
+
+        Returns:
+            Checkers: the game after its last move
+        """
+        n = self.get_n()
+        fen = self.tags.get("FEN", start_fen(n, Player.TOP))
+        game = Checkers.from_fen(fen, n)
+        game.start_turn = game.get_turn()
+        for pos, dest in self.get_hops():
+            if not game.is_valid_move(pos, dest):
+                raise Exception("Invalid move in PDN game: {} -> {}"
+                                .format(pos, dest))
+            game.move(pos, dest)
+        return game
+
+
+def read_games(path):
+    """
+    Reads the games of a PDN file one at a time.
+
+    Parameters:
+        path: str: PDN file
+
+    Returns: Generator[PDNGame]: the games of the file, in order
+    """
+    with open(path, encoding="utf-8") as f:
+        tags = {}
+        moves = []
+        in_comment = False
+        for line in f:
+            line = line.strip()
+            if not in_comment and line.startswith("["):
+                name, _, value = line[1:].rstrip("]").partition(" ")
+                tags[name] = value.strip().strip('"')
+                continue
+
+            for token in line.split():
+                # skip {comments}, which can span several lines
+                if in_comment:
+                    in_comment = not token.endswith("}")
+                    continue
+                if token.startswith("{"):
+                    in_comment = not token.endswith("}")
+                    continue
+
+                if token in RESULTS:
+                    yield PDNGame(tags, moves, token)
+                    tags = {}
+                    moves = []
+                    continue
+                # drop move numbers such as "12." or "12..."
+                token = token.rsplit(".", 1)[-1]
+                if token:
+                    moves.append(token)
+
+        if moves or tags:
+            yield PDNGame(tags, moves, tags.get("Result", "*"))
@@ -0,0 +1,119 @@
+"""
+Perft for Checkers
+
+Counts the leaves of the tree of legal moves to a given depth. The counts only
+depend on the rules, so they show whether a change to move generation kept
+the rules intact, and the time taken gives a reproducible throughput number.
+Every jump of a multiple-jump move counts as one ply, as it does for
+Checkers.move.
+
+Examples:
+    $ python3 src/perft.py --depth 6
+    $ python3 src/perft.py --depth 5 --board-size 4 --divide
+"""
+import time
+from checkers import Checkers, GameState, Player
+from bitboard import BitboardCheckers
+import click
+
+
+def perft(game, depth):
+    """
+    Counts the positions reached after exactly depth moves from the current
+    position of a game. Moves are made and undone on the game itself.
+
+    Parameters:
+        game: Checkers or BitboardCheckers: game to count moves from
+        depth: int: number of moves (single jumps or steps) to look ahead
+
+    Returns: int: number of leaf positions
+    """
+    if depth == 0:
+        return 1
+    if game._game_over:
+        return 0
+
+    moves = game.player_moves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        record = game.apply_move(move)
+        nodes += perft(game, depth - 1)
+        game.undo_move(record)
+    return nodes
+
+
+def divide(game, depth):
+    """
+    Counts the leaf positions below each move of the current position.
+
+    Parameters:
+        game: Checkers or BitboardCheckers: game to count moves from
+        depth: int: number of moves to look ahead, including the first one
+
+    Returns: List[Tuple]: tuples of the position of the piece, the destination
+        and the number of leaf positions below that move
+    """
+    counts = []
+    if game._game_over:
+        return counts
+    for move in game.player_moves():
+        record = game.apply_move(move)
+        counts.append((move[0], move[1], perft(game, depth - 1)))
+        game.undo_move(record)
+    return counts
+
+
+@click.command(name="checkers-perft")
+@click.option('-d', '--depth', type=click.INT, default=5)
+@click.option('--board-size', type=click.INT, default=3)
+@click.option('--turn', type=click.Choice(['top', 'bottom'],
+                                          case_sensitive=False),
+              default="top", help="player to move from the start position")
+@click.option('--position', type=click.STRING, default=None,
+              help="hex encoded snapshot (Checkers.snapshot().to_bytes())")
+@click.option('--fen', type=click.STRING, default=None,
+              help="position in FEN notation (Checkers.to_fen())")
+@click.option('--engine', type=click.Choice(['checkers', 'bitboard'],
+                                            case_sensitive=False),
+              default="checkers")
+@click.option('--divide', 'show_divide', is_flag=True, default=False,
+              help="show the number of leaves below each first move")
+def cmd(depth, board_size, turn, position, fen, engine, show_divide):
+    if engine == "bitboard":
+        engine_cls = BitboardCheckers
+    else:
+        engine_cls = Checkers
+
+    if position is not None:
+        game = engine_cls.from_snapshot(GameState(bytes.fromhex(position)))
+    elif fen is not None:
+        game = Checkers.from_fen(fen, board_size)
+        if engine_cls is not Checkers:
+            game = engine_cls.from_snapshot(game.snapshot())
+    else:
+        game = engine_cls(board_size)
+        game.set_turn(Player[turn.upper()])
+        game.start_turn = game.get_turn()
+
+    start = time.perf_counter()
+    if show_divide:
+        nodes = 0
+        for pos, dest, count in divide(game, depth):
+            print(f"{pos} -> {dest}: {count}")
+            nodes += count
+        print()
+    else:
+        nodes = perft(game, depth)
+    elapsed = time.perf_counter() - start
+
+    print(f"Nodes: {nodes}")
+    print(f"Time: {elapsed:.3f} s")
+    if elapsed > 0:
+        print(f"Nodes/sec: {nodes / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    cmd()
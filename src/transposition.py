@@ -0,0 +1,328 @@
+"""
+Transposition table for game tree search
+
+A TranspositionTable remembers the results of searching positions, keyed by
+their position keys (Checkers.position_key()), so that a position reached
+again through a different order of moves, or in a later search, does not
+have to be searched again.
+
+Entries are kept in flat arrays sized once from a memory budget. The table is
+split into buckets of two entries: the first keeps the deepest search of a
+position of the current search (depth-preferred), the second always takes
+the newest result (always-replace).
+
+A SharedTranspositionTable keeps the same buckets in shared memory, so that
+several processes searching the same position share what they find. Each
+entry is packed into three 64-bit words (the key xored with the other two,
+the score, and the move, depth, bound and age), written without locks. A
+write torn by another process writing the same entry at the same time
+leaves words that no longer xor to the key, and the entry is ignored.
+"""
+import struct
+from array import array
+from multiprocessing import shared_memory
+
+# bound types: the stored score is exact, a lower bound of the true score
+# (the search failed high) or an upper bound of it (the search failed low)
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# bytes used by an entry: key, score, move, depth, bound and age
+ENTRY_SIZE = 8 + 8 + 8 + 1 + 1 + 1
+
+# entry of a shared table: checksum (key ^ score bits ^ data), score and
+# data (move in bits 0-47, depth in bits 48-55, bound in bits 56-57 and age
+# in bits 58-63)
+_SHARED_ENTRY = struct.Struct('<QdQ')
+_SHARED_WORDS = struct.Struct('<QQQ')
+# shared table header: age of the current search, padded to a cache line
+_SHARED_HEADER = struct.Struct('<Q56x')
+_MOVE_MASK = (1 << 48) - 1
+
+
+def encode_path(path):
+    """
+    Encodes a move as a nonzero 48-bit integer, to store it as the best move
+    of a position: the starting square, the number of hops, whether the
+    move jumps, and two bits for the direction of each hop. Moves of up to
+    13 hops are encoded exactly; the directions of later hops are xored
+    over those of the first ones, which is accepted since hardly any move is
+    that long.
+
+    Parameters:
+        path: Tuple(Tuple(int)): positions the piece moves through,
+            starting with its current position
+
+    Returns: int: encoded move
+    """
+    (i, j), (i1, _) = path[0], path[1]
+    hops = len(path) - 1
+    code = (i << 8 | j) << 32 | min(hops, 31) << 27 | (abs(i1 - i) == 2) << 26
+    for k in range(hops):
+        (i0, j0), (i1, j1) = path[k], path[k + 1]
+        code ^= ((i1 > i0) << 1 | (j1 > j0)) << 2 * (k % 13)
+    return code
+
+
+class TranspositionTable:
+    """
+    Class for storing search results of positions in a fixed amount of memory
+    """
+
+    def __init__(self, megabytes):
+        """
+        Constructor
+
+        Parameters:
+            megabytes: float: memory budget of the table
+        """
+        buckets = 1
+        while 2 * buckets * 2 * ENTRY_SIZE <= megabytes * 2 ** 20:
+            buckets *= 2
+        size = 2 * buckets
+        self._mask = buckets - 1
+        self._keys = array('Q', bytes(8 * size))
+        self._scores = array('d', bytes(8 * size))
+        self._moves = array('q', bytes(8 * size))
+        self._depths = array('b', bytes(size))
+        self._bounds = array('b', bytes(size))
+        self._ages = array('B', bytes(size))
+        self._age = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new search. Entries of earlier searches can be
+        replaced by shallower ones.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._age = (self._age + 1) % 256
+
+    def probe(self, key):
+        """
+        Looks up a position.
+
+        Parameters:
+            key: int: position key
+
+        Returns: Tuple: depth searched, bound type, score and encoded best
+            move (None if unknown) of the position, or None if the position
+            is not in the table
+        """
+        slot = (key & self._mask) << 1
+        if self._keys[slot] != key:
+            slot += 1
+            if self._keys[slot] != key:
+                return None
+        move = self._moves[slot]
+        return (self._depths[slot], self._bounds[slot], self._scores[slot],
+                move if move >= 0 else None)
+
+    def store(self, key, depth, bound, score, move=None):
+        """
+        Records the result of searching a position.
+
+        Parameters:
+            key: int: position key
+            depth: int: depth the position was searched to
+            bound: int: EXACT, LOWER or UPPER
+            score: float: score found by the search
+            move: int: encoded best move, None if unknown
+
+        Returns:
+            None
+        """
+        slot = (key & self._mask) << 1
+        keys = self._keys
+        old = keys[slot]
+        # the depth-preferred entry is kept unless the new search is at least
+        # as deep, or it is left over from an earlier search
+        if (old == 0 or self._ages[slot] != self._age
+                or self._depths[slot] <= depth):
+            if old != key and old != 0:
+                # the replaced entry moves to the always-replace slot
+                for values in (keys, self._scores, self._moves, self._depths,
+                               self._bounds, self._ages):
+                    values[slot + 1] = values[slot]
+            elif keys[slot + 1] == key:
+                keys[slot + 1] = 0
+        else:
+            slot += 1
+        keys[slot] = key
+        self._scores[slot] = score
+        self._moves[slot] = -1 if move is None else move
+        self._depths[slot] = depth
+        self._bounds[slot] = bound
+        self._ages[slot] = self._age
+
+
+class SharedTranspositionTable:
+    """
+    Class for storing search results of positions in shared memory, so that
+    searches in several processes can use each other's results
+    """
+
+    def __init__(self, megabytes=None, name=None):
+        """
+        Constructor. Creates a new table, or opens the table created by
+        another process.
+
+        Parameters:
+            megabytes: float: memory budget of a new table
+            name: str: name of an existing table, as returned by get_name()
+        """
+        if name is None:
+            buckets = 1
+            while (2 * buckets * 2 * _SHARED_ENTRY.size
+                   <= megabytes * 2 ** 20):
+                buckets *= 2
+            self._memory = shared_memory.SharedMemory(
+                create=True,
+                size=_SHARED_HEADER.size + 2 * buckets * _SHARED_ENTRY.size)
+            self._memory.buf[:] = bytes(self._memory.size)
+            self._owner = True
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+            buckets = ((self._memory.size - _SHARED_HEADER.size)
+                       // (2 * _SHARED_ENTRY.size))
+            self._owner = False
+        self._buf = self._memory.buf
+        self._mask = buckets - 1
+
+    def get_name(self):
+        """
+        Returns the name other processes open the table with.
+
+        Parameters:
+            None
+
+        Returns:
+            str: name of the shared memory block
+        """
+        return self._memory.name
+
+    def close(self):
+        """
+        Closes the table in this process. The process that created the table
+        also frees it, after which other processes can no longer open it.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if self._buf is None:
+            return
+        self._buf.release()
+        self._buf = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+    def new_search(self):
+        """
+        Marks the start of a new search. Entries of earlier searches can be
+        replaced by shallower ones. Only the process that created the table
+        moves it on to a new search.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if self._owner:
+            age, = _SHARED_HEADER.unpack_from(self._buf)
+            _SHARED_HEADER.pack_into(self._buf, 0, (age + 1) % 64)
+
+    def _read(self, slot):
+        """
+        Reads an entry.
+
+        Parameters:
+            slot: int: index of the entry
+
+        Returns: Tuple: key (0 if the entry is empty or torn), score and data
+        """
+        offset = _SHARED_HEADER.size + slot * _SHARED_ENTRY.size
+        # one copy of the entry, so that the words checked are the words used
+        raw = bytes(self._buf[offset:offset + _SHARED_ENTRY.size])
+        check, bits, data = _SHARED_WORDS.unpack(raw)
+        return check ^ bits ^ data, _SHARED_ENTRY.unpack(raw)[1], data
+
+    def _write(self, slot, key, score, data):
+        """
+        Writes an entry.
+
+        Parameters:
+            slot: int: index of the entry
+            key: int: position key
+            score: float: score found by the search
+            data: int: packed move, depth, bound and age
+
+        Returns:
+            None
+        """
+        raw = _SHARED_ENTRY.pack(0, score, data)
+        bits = _SHARED_WORDS.unpack(raw)[1]
+        _SHARED_ENTRY.pack_into(
+            self._buf, _SHARED_HEADER.size + slot * _SHARED_ENTRY.size,
+            key ^ bits ^ data, score, data)
+
+    def probe(self, key):
+        """
+        Looks up a position.
+
+        Parameters:
+            key: int: position key
+
+        Returns: Tuple: depth searched, bound type, score and encoded best
+            move (None if unknown) of the position, or None if the position
+            is not in the table
+        """
+        slot = (key & self._mask) << 1
+        stored, score, data = self._read(slot)
+        if stored != key:
+            stored, score, data = self._read(slot + 1)
+            if stored != key:
+                return None
+        move = data & _MOVE_MASK
+        return (data >> 48 & 255, data >> 56 & 3, score,
+                move if move else None)
+
+    def store(self, key, depth, bound, score, move=None):
+        """
+        Records the result of searching a position.
+
+        Parameters:
+            key: int: position key
+            depth: int: depth the position was searched to
+            bound: int: EXACT, LOWER or UPPER
+            score: float: score found by the search
+            move: int: encoded best move, None if unknown
+
+        Returns:
+            None
+        """
+        age, = _SHARED_HEADER.unpack_from(self._buf)
+        data = (move or 0) | depth << 48 | bound << 56 | age << 58
+        slot = (key & self._mask) << 1
+        old, old_score, old_data = self._read(slot)
+        # the depth-preferred entry is kept unless the new search is at least
+        # as deep, or it is left over from an earlier search
+        if (old == 0 or old_data >> 58 != age
+                or old_data >> 48 & 255 <= depth):
+            if old != key and old != 0:
+                # the replaced entry moves to the always-replace slot
+                self._write(slot + 1, old, old_score, old_data)
+            elif self._read(slot + 1)[0] == key:
+                self._write(slot + 1, 0, 0.0, 0)
+        else:
+            slot += 1
+        self._write(slot, key, score, data)
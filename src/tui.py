@@ -3,6 +3,7 @@ import time
 import click
 from checkers import Board, Checkers, Player, Piece
 from bot import RandomBot, SmartBot
+from pdn import PDNWriter
 
 
 class TUIPlayer:
@@ -14,7 +15,8 @@ class TUIPlayer:
     '''
 
     def __init__(self, n: int, player_type: str, board: Checkers,
-                 player: Player, opponent: Player, bot_delay: float):
+                 player: Player, opponent: Player, bot_delay: float,
+                 think_ms: float = None):
         '''
         Constructor
 
@@ -26,6 +28,8 @@ class TUIPlayer:
         opponent: whether opponent is top or bottom
         bot_delay: When playing as a bot, an artificial delay
            (in seconds) to wait before making a move.
+        think_ms: time budget per move of a smart bot in milliseconds,
+           None to search to a fixed depth
         '''
         if player_type == "human":
             self.name = f"Player {n}"
@@ -35,7 +39,7 @@ class TUIPlayer:
             self.bot = RandomBot(board, player, opponent)
         elif player_type == "smart-bot":
             self.name = f"Smart Bot {n}"
-            self.bot = SmartBot(board, player, opponent)
+            self.bot = SmartBot(board, player, opponent, think_ms=think_ms)
         self.board = board
         self.player = player
         self.bot_delay = bot_delay
@@ -199,13 +203,15 @@ def print_board(board: Checkers) -> None:
     print(board)
 
 
-def play_checkers(board: Checkers, players: dict) -> None:
+def play_checkers(board: Checkers, players: dict,
+                  pdn: PDNWriter = None) -> None:
     '''
     Plays a game of checkers on the terminal
 
     Inputs:      
     board: [Checkers] board to play on
     players: [Dictionary] maps TOP or BOTTOM to TUIPlayer objects.
+    pdn: [PDNWriter] writer to log the finished game to, if not None
 
     Outputs: None
     '''
@@ -230,6 +236,11 @@ def play_checkers(board: Checkers, players: dict) -> None:
     print_board(board)
     print(board.winner())
 
+    if pdn is not None:
+        pdn.write_game(board, {"Event": "checkers-tui",
+                               "Black": players[Player.TOP].name,
+                               "White": players[Player.BOTTOM].name})
+
 
 @click.command(name="checkers-tui")
 @click.option('--board-size',
@@ -243,15 +254,25 @@ def play_checkers(board: Checkers, players: dict) -> None:
                                 case_sensitive=False),
               default="human")
 @click.option('--bot-delay', type=click.FLOAT, default=0.5)
+@click.option('--pdn', type=click.Path(dir_okay=False), default=None,
+              help="PDN file to append the finished game to")
+@click.option('--think-ms', type=click.FLOAT, default=None,
+              help="time budget per move of smart bots in milliseconds")
 
-def cmd(player1, player2, bot_delay, board_size):
+def cmd(player1, player2, bot_delay, board_size, pdn, think_ms):
     board = Checkers(board_size)
-    player1 = TUIPlayer(1, player1, board, Player.TOP, Player.BOTTOM, bot_delay)
-    player2 = TUIPlayer(2, player2, board, Player.BOTTOM, Player.TOP, bot_delay)
+    player1 = TUIPlayer(1, player1, board, Player.TOP, Player.BOTTOM, bot_delay,
+                        think_ms)
+    player2 = TUIPlayer(2, player2, board, Player.BOTTOM, Player.TOP, bot_delay,
+                        think_ms)
 
     players = {Player.TOP: player1, Player.BOTTOM: player2}
 
-    play_checkers(board, players)
+    if pdn is not None:
+        with PDNWriter(pdn) as writer:
+            play_checkers(board, players, writer)
+    else:
+        play_checkers(board, players)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+"""
+Equivalence of the bitboard engine with checkers.Checkers: move counts of
+perft and random games played by both engines in lockstep
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bitboard import BitboardCheckers  # noqa: E402
+from checkers import Checkers, Player  # noqa: E402
+from perft import perft  # noqa: E402
+
+
+def moves_of(game):
+    """
+    Returns the moves of the turn player in a form both engines share.
+
+    Parameters:
+        game: Checkers or BitboardCheckers: game to inspect
+
+    Returns:
+        List[Tuple]: sorted positions, destinations and jumped positions
+    """
+    moves = []
+    for pos, dest, jumped in game.player_moves():
+        if jumped is not None and not isinstance(jumped, tuple):
+            jumped = jumped.get_pos()
+        moves.append((pos, dest, jumped))
+    return sorted(moves)
+
+
+def test_perft_matches():
+    for n, depth in ((1, 12), (2, 7), (3, 6)):
+        for turn in (Player.TOP, Player.BOTTOM):
+            game = Checkers(n)
+            game.set_turn(turn)
+            bitboard = BitboardCheckers(n)
+            bitboard.set_turn(turn)
+            assert perft(bitboard, depth) == perft(game, depth)
+
+
+def test_perft_matches_in_play():
+    # positions with kings and multi-jumps in progress, loaded by both
+    # engines from the same snapshot, so that neither knows the positions
+    # before it for repetitions
+    rng = random.Random(0)
+    for n in (1, 2, 3):
+        for _ in range(10):
+            game = Checkers(n)
+            for _ in range(rng.randint(5, 60)):
+                if game._game_over:
+                    break
+                pos, dest, _ = rng.choice(game.player_moves())
+                game.move(pos, dest)
+            state = game.snapshot()
+            game = Checkers.from_snapshot(state)
+            bitboard = BitboardCheckers.from_snapshot(state)
+            assert bitboard.snapshot() == state
+            assert perft(bitboard, 4) == perft(game, 4)
+
+
+def test_lockstep_games():
+    for n in (1, 2, 3):
+        for seed in range(30):
+            rng = random.Random(seed)
+            game = Checkers(n)
+            bitboard = BitboardCheckers(n)
+            bitboard.set_turn(game.get_turn())
+            bitboard.start_turn = game.start_turn
+            while not game._game_over:
+                assert moves_of(bitboard) == moves_of(game)
+                assert str(bitboard) == str(game)
+                assert bitboard.snapshot() == game.snapshot()
+                assert bitboard.repetition_count() == game.repetition_count()
+                pos, dest, _ = rng.choice(game.player_moves())
+                assert bitboard.is_valid_move(pos, dest)
+                game.move(pos, dest)
+                bitboard.move(pos, dest)
+            assert bitboard._game_over
+            assert bitboard.get_game_state() == game.get_game_state()
+            assert bitboard.get_history() == game.get_history()
@@ -0,0 +1,113 @@
+"""
+Round trips of games played with move_sequence() through PDN files and game
+archives
+"""
+import os
+import random
+import struct
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from archive import ArchiveWriter, GameArchive  # noqa: E402
+from checkers import Checkers  # noqa: E402
+from pdn import PDNWriter, read_games  # noqa: E402
+
+
+def play_sequences(seed, n=3, max_moves=200):
+    """
+    Plays a random game with move_sequence().
+
+    Parameters:
+        seed: int: seed of the random moves
+        n: int: the number of rows of pieces a player starts with
+        max_moves: int: most complete moves to play
+
+    Returns:
+        Checkers: the game
+    """
+    rng = random.Random(seed)
+    game = Checkers(n)
+    for _ in range(max_moves):
+        if game._game_over:
+            break
+        path, _ = rng.choice(game.player_sequences())
+        game.move_sequence(path)
+    return game
+
+
+def test_move_sequence_records_every_hop():
+    for seed in range(20):
+        game = play_sequences(seed)
+        replay = Checkers(game._n)
+        replay.set_turn(game.start_turn)
+        replay.start_turn = game.start_turn
+        for _, pos, dest in game.get_history():
+            assert replay.is_valid_move(pos, dest)
+            replay.move(pos, dest)
+        assert replay.snapshot() == game.snapshot()
+
+
+def test_pdn_round_trip(tmp_path):
+    path = str(tmp_path / "games.pdn")
+    games = [play_sequences(seed) for seed in range(10)]
+    with PDNWriter(path) as writer:
+        for game in games:
+            writer.write_game(game)
+
+    records = list(read_games(path))
+    assert len(records) == len(games)
+    for game, record in zip(games, records):
+        assert record.to_checkers().snapshot() == game.snapshot()
+
+
+def test_archive_round_trip(tmp_path):
+    path = str(tmp_path / "games.cka")
+    games = [play_sequences(seed, n=4) for seed in range(10)]
+    with ArchiveWriter(path) as writer:
+        for game in games:
+            writer.write_game(game)
+
+    with GameArchive(path) as archive:
+        assert len(archive) == len(games)
+        moves = []
+        for i, game in enumerate(games):
+            moves.append(archive.get_moves(i))
+            assert len(moves[-1]) == len(game.get_history())
+            assert archive.replay(i).snapshot() == game.snapshot()
+
+    # the moves outlive the archive
+    assert [len(codes) for codes in moves] == [
+        len(game.get_history()) for game in games]
+
+
+def test_not_an_archive(tmp_path):
+    for data in (b"", b"CKA", b"PK\x03\x04" + bytes(40)):
+        path = tmp_path / "bad.cka"
+        path.write_bytes(data)
+        with pytest.raises(Exception, match="Not a game archive"):
+            GameArchive(str(path))
+
+
+def test_unclosed_archive(tmp_path):
+    path = tmp_path / "games.cka"
+    games = [play_sequences(seed, n=4) for seed in range(5)]
+    with ArchiveWriter(str(path)) as writer:
+        for game in games:
+            writer.write_game(game)
+    data = path.read_bytes()
+    # the footer starts with the offset of the index, where the games end
+    index, = struct.unpack_from("<Q", data, len(data) - 20)
+
+    # killed before closing, while writing the last game, while writing the
+    # index and while writing the footer
+    for end, count in ((index, 5), (index - 3, 4), (index + 20, 5),
+                       (len(data) - 1, 5)):
+        path.write_bytes(data[:end])
+        with GameArchive(str(path)) as archive:
+            assert len(archive) == count
+            for i in range(count):
+                assert (archive.replay(i).snapshot()
+                        == games[i].snapshot())
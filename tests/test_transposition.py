@@ -0,0 +1,111 @@
+"""
+Move encoding and replacement policy of the transposition tables
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from checkers import Checkers  # noqa: E402
+from transposition import (EXACT, LOWER, SharedTranspositionTable,  # noqa: E402
+                           TranspositionTable, encode_path)
+
+
+@pytest.fixture(params=["plain", "shared"])
+def table(request):
+    if request.param == "plain":
+        yield TranspositionTable(0.01)
+    else:
+        shared = SharedTranspositionTable(0.01)
+        yield shared
+        shared.close()
+
+
+def same_bucket(table, count):
+    """
+    Returns position keys that all fall in the same bucket of a table.
+
+    Parameters:
+        table: TranspositionTable or SharedTranspositionTable: the table
+        count: int: number of keys
+
+    Returns:
+        List[int]: the keys
+    """
+    return [5 + k * (table._mask + 1) for k in range(count)]
+
+
+def test_encode_path_is_unique():
+    for n in (1, 2, 3, 4):
+        for seed in range(20):
+            rng = random.Random(seed)
+            game = Checkers(n)
+            while not game._game_over:
+                sequences = game.player_sequences()
+                codes = {encode_path(path) for path, _ in sequences}
+                assert len(codes) == len(sequences)
+                assert all(0 < code < 1 << 48 for code in codes)
+                path, _ = rng.choice(sequences)
+                game.move_sequence(path)
+
+
+def test_encode_path_tells_routes_apart():
+    # the king can jump around the ring of men either way, through the same
+    # first and last squares
+    game = Checkers.from_fen("W:WK30:B5,9,10,11,18,19,26,29", 3)
+    paths = [path for path, _ in game.player_sequences()]
+    assert len(paths) == 2 and paths[0][1] == paths[1][1]
+    assert paths[0][-1] == paths[1][-1]
+    assert encode_path(paths[0]) != encode_path(paths[1])
+
+
+def test_store_and_probe(table):
+    key, = same_bucket(table, 1)
+    assert table.probe(key) is None
+    table.store(key, 4, LOWER, 12.5, 77)
+    assert table.probe(key) == (4, LOWER, 12.5, 77)
+    table.store(key, 5, EXACT, -3.0)
+    assert table.probe(key) == (5, EXACT, -3.0, None)
+
+
+def test_deeper_entry_is_kept(table):
+    deep, shallow, newer = same_bucket(table, 3)
+    table.store(deep, 6, EXACT, 1.0)
+    table.store(shallow, 2, EXACT, 2.0)
+    assert table.probe(deep)[0] == 6
+    assert table.probe(shallow)[0] == 2
+
+    # a shallow result only ever takes the always-replace slot
+    table.store(newer, 1, EXACT, 3.0)
+    assert table.probe(deep)[0] == 6
+    assert table.probe(shallow) is None
+    assert table.probe(newer)[0] == 1
+
+
+def test_displaced_entry_moves_to_always_replace(table):
+    first, deeper, other = same_bucket(table, 3)
+    table.store(first, 3, EXACT, 1.0, 11)
+    table.store(deeper, 5, EXACT, 2.0, 22)
+    assert table.probe(first) == (3, EXACT, 1.0, 11)
+    assert table.probe(deeper) == (5, EXACT, 2.0, 22)
+
+    table.store(other, 1, EXACT, 3.0)
+    assert table.probe(first) is None
+    assert table.probe(deeper)[0] == 5
+
+
+def test_stale_entries_are_replaced(table):
+    old, new, other = same_bucket(table, 3)
+    table.store(old, 9, EXACT, 1.0)
+    table.new_search()
+    table.store(new, 1, EXACT, 2.0)
+    assert table.probe(new)[0] == 1
+    assert table.probe(old)[0] == 9
+
+    # the new entry now holds the depth-preferred slot for this search
+    table.store(other, 0, EXACT, 3.0)
+    assert table.probe(new)[0] == 1
+    assert table.probe(old) is None
@@ -0,0 +1,61 @@
+"""
+Making and taking back moves with apply_move()/undo_move() and
+apply_sequence()/undo_sequence(), as the search of SmartBot does at every
+node
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from checkers import Checkers  # noqa: E402
+
+
+def state(game):
+    """
+    Returns everything a move changes that undoing it has to restore.
+
+    Parameters:
+        game: Checkers: game to inspect
+
+    Returns:
+        Tuple: comparable state of the game
+    """
+    moves = sorted((pos, dest, None if jumped is None else jumped.get_pos())
+                   for pos, dest, jumped in game.player_moves())
+    return (game.snapshot(), game.position_key(), dict(game._key_counts),
+            list(game._key_history), list(game._men), list(game._kings),
+            list(game._advancement), moves, str(game))
+
+
+def test_undo_restores_every_position():
+    seen = {"multi-jumps": 0, "promotions": 0, "game ends": 0}
+    for n in (1, 2, 3):
+        for seed in range(6):
+            rng = random.Random(seed)
+            game = Checkers(n)
+            while not game._game_over:
+                before = state(game)
+                for move in list(game.player_moves()):
+                    record = game.apply_move(move)
+                    seen["promotions"] += record[1]
+                    game.undo_move(record)
+                    assert state(game) == before
+
+                for sequence in game.player_sequences():
+                    records = game.apply_sequence(sequence)
+                    seen["multi-jumps"] += len(sequence[0]) > 2
+                    seen["game ends"] += game._game_over
+                    if not game._game_over:
+                        after = state(game)
+                        for reply in game.player_sequences():
+                            game.undo_sequence(game.apply_sequence(reply))
+                            assert state(game) == after
+                    game.undo_sequence(records)
+                    assert state(game) == before
+
+                path, _ = rng.choice(game.player_sequences())
+                game.move_sequence(path)
+
+    assert all(count > 0 for count in seen.values()), seen